@@ -0,0 +1,150 @@
+"""
+Чекпоинты обхода HeadHunter: докачка после падения и инкрементальный режим
+
+Состояние хранится в SQLite-файле рядом с parsed_jobs:
+    pages       — уже полученные страницы (профессия, регион, страница) с ответом API
+    professions — профессии, завершённые в текущем запуске
+    last_success— когда профессия последний раз была обойдена целиком
+                  (с этого момента инкрементальный режим запрашивает date_from)
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DEFAULT_STATE_PATH = Path("parsed_jobs") / "crawl_state.db"
+# HeadHunter принимает date_from в ISO 8601
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%S%z"
+
+
+def utc_now() -> str:
+    return datetime.now(timezone.utc).strftime(DATE_FORMAT)
+
+
+class CrawlState:
+    """
+    Состояние обхода, переживающее падение процесса
+
+    Args:
+        path: Путь к файлу состояния
+        resume: Если True, продолжает незавершённый запуск; иначе начинает новый
+    """
+
+    def __init__(self, path: Path = DEFAULT_STATE_PATH, resume: bool = False):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                profession TEXT NOT NULL,
+                area INTEGER NOT NULL,
+                page INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (profession, area, page)
+            );
+            CREATE TABLE IF NOT EXISTS professions (
+                profession TEXT PRIMARY KEY,
+                finished_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS last_success (
+                profession TEXT PRIMARY KEY,
+                crawled_from TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            """
+        )
+
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'run_started_at'").fetchone()
+        self.resumed = resume and row is not None
+        with self._conn:
+            if self.resumed:
+                self.run_started_at = row[0]
+            else:
+                self._conn.execute("DELETE FROM pages")
+                self._conn.execute("DELETE FROM professions")
+                self.run_started_at = utc_now()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('run_started_at', ?)",
+                    (self.run_started_at,),
+                )
+
+    def get_page(self, profession: str, area: Optional[int], page: int) -> Optional[Dict[str, Any]]:
+        """
+        Ответ API для уже полученной страницы или None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM pages WHERE profession = ? AND area = ? AND page = ?",
+                (profession, area or 0, page),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_page(self, profession: str, area: Optional[int], page: int, data: Dict[str, Any]) -> None:
+        encoded = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (profession, area, page, data) VALUES (?, ?, ?, ?)",
+                (profession, area or 0, page, encoded),
+            )
+
+    def is_profession_done(self, profession: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM professions WHERE profession = ?", (profession,)
+            ).fetchone()
+        return row is not None
+
+    def mark_profession_done(self, profession: str) -> None:
+        """
+        Профессия сохранена на диск: страницы больше не нужны, запоминаем время обхода
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM pages WHERE profession = ?", (profession,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO professions (profession, finished_at) VALUES (?, ?)",
+                (profession, utc_now()),
+            )
+            # Отсчитываем от начала запуска: вакансии, вышедшие во время обхода, попадут в следующий
+            self._conn.execute(
+                "INSERT OR REPLACE INTO last_success (profession, crawled_from) VALUES (?, ?)",
+                (profession, self.run_started_at),
+            )
+
+    def last_success(self, profession: str) -> Optional[str]:
+        """
+        Момент начала последнего успешного обхода профессии (для date_from)
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT crawled_from FROM last_success WHERE profession = ?", (profession,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def finish_run(self) -> None:
+        """
+        Запуск завершён целиком: следующий начнётся с чистого листа даже с resume
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM pages")
+            self._conn.execute("DELETE FROM professions")
+            self._conn.execute("DELETE FROM meta WHERE key = 'run_started_at'")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            (pages,) = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()
+            (done,) = self._conn.execute("SELECT COUNT(*) FROM professions").fetchone()
+        return {"resumed": self.resumed, "run_started_at": self.run_started_at, "pages": pages, "professions_done": done}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
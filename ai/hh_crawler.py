@@ -0,0 +1,567 @@
+"""
+Асинхронный параллельный краулер вакансий HeadHunter
+
+Логика обхода та же, что у get_all_vacancies_for_profession из test_api.py,
+но страницы, регионы и профессии запрашиваются параллельно через одну
+общую сессию httpx. Вместо фиксированных пауз частоту запросов ограничивает
+общий token bucket, число одновременных соединений с хостом — семафор.
+На 429 и 5xx запрос повторяется с экспоненциальной задержкой.
+
+Уже полученные страницы и завершённые профессии записываются в чекпоинт
+(crawl_state.py), поэтому после падения обход можно продолжить с --resume.
+С --incremental запрашиваются только вакансии, опубликованные после
+последнего успешного обхода профессии, и они сливаются с уже сохранёнными.
+
+Запуск:
+    python hh_crawler.py [--professions "Python Developer" Cook] [--rate 5]
+    python hh_crawler.py --resume          # продолжить упавший обход
+    python hh_crawler.py --incremental     # ночное обновление
+
+Для проверки без похода в настоящий API:
+    python hh_stub_server.py --port 8765 &
+    HH_API_URL=http://127.0.0.1:8765 python hh_crawler.py --professions Developer Cook
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from crawl_state import DEFAULT_STATE_PATH, CrawlState
+from test_api import (
+    AREAS,
+    PROFESSIONS,
+    create_profession_folder,
+    load_profession_data,
+    parse_vacancy,
+    remove_duplicates,
+    save_profession_data,
+)
+from vacancy_store import (
+    JSONL_BASENAME,
+    STORAGE_FORMATS,
+    VacancyWriter,
+    find_profession_file,
+    iter_vacancies,
+)
+
+HH_API_URL = os.getenv("HH_API_URL", "https://api.hh.ru")
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+MAX_RESULTS = 2000  # Ограничение API: не больше 2000 вакансий на один запрос
+PER_PAGE = 100
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Получает разобранные вакансии одной страницы
+PageCallback = Callable[[List[Dict[str, Any]]], Any]
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты запросов: rate токенов в секунду, не больше burst подряд
+
+    Ожидающие получают токены по очереди (FIFO) под общей блокировкой.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Притормаживает всех: следующий токен появится не раньше чем через seconds
+        """
+        self._refill()
+        self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+
+
+@dataclass
+class CrawlProgress:
+    """
+    Счётчики прогресса обхода
+    """
+    professions_total: int = 0
+    professions_done: int = 0
+    requests: int = 0
+    retries: int = 0
+    errors: int = 0
+    pages: int = 0
+    resumed_pages: int = 0
+    vacancies: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    def snapshot(self) -> Dict[str, Any]:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {
+            "professions_done": self.professions_done,
+            "professions_total": self.professions_total,
+            "requests": self.requests,
+            "retries": self.retries,
+            "errors": self.errors,
+            "pages": self.pages,
+            "resumed_pages": self.resumed_pages,
+            "vacancies": self.vacancies,
+            "elapsed_seconds": round(elapsed, 1),
+            "requests_per_second": round(self.requests / elapsed, 2),
+            "vacancies_per_second": round(self.vacancies / elapsed, 1),
+        }
+
+    def format(self) -> str:
+        stats = self.snapshot()
+        return (
+            f"[прогресс] профессий {stats['professions_done']}/{stats['professions_total']}, "
+            f"страниц {stats['pages']} (+{stats['resumed_pages']} из чекпоинта), вакансий {stats['vacancies']}, "
+            f"запросов {stats['requests']} ({stats['requests_per_second']}/с), "
+            f"повторов {stats['retries']}, ошибок {stats['errors']}, {stats['elapsed_seconds']} c"
+        )
+
+
+class HHCrawler:
+    """
+    Параллельный обход API HeadHunter через общую пуловую сессию
+
+    Args:
+        base_url: Адрес API (по умолчанию HH_API_URL)
+        rate: Сколько запросов в секунду разрешено суммарно
+        burst: Сколько запросов можно сделать подряд без ожидания
+        max_per_host: Сколько одновременных запросов к одному хосту
+        max_retries: Сколько раз повторять запрос на 429/5xx и сетевые ошибки
+        backoff: Базовая задержка перед повтором, секунды (удваивается)
+        timeout: Таймаут одного запроса, секунды
+        state: Чекпоинт обхода (без него страницы не сохраняются)
+    """
+
+    def __init__(
+        self,
+        base_url: str = HH_API_URL,
+        rate: float = 5.0,
+        burst: int = 10,
+        max_per_host: int = 8,
+        max_retries: int = 5,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        timeout: float = 10.0,
+        state: Optional[CrawlState] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.max_per_host = max_per_host
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate, burst)
+        self.progress = CrawlProgress()
+        self.state = state
+        self._failed_queries: Counter = Counter()
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def __aenter__(self) -> "HHCrawler":
+        self._client = httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT},
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_per_host,
+                max_keepalive_connections=self.max_per_host,
+            ),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.max_per_host)
+        return self._host_limits[host]
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return float(retry_after)
+        delay = min(self.max_backoff, self.backoff * (2 ** attempt))
+        return delay + random.uniform(0, delay / 2)
+
+    async def get_vacancies(
+        self,
+        query: str,
+        page: int = 0,
+        per_page: int = PER_PAGE,
+        area: Optional[int] = None,
+        date_from: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Асинхронный аналог test_api.get_vacancies
+
+        Returns:
+            Словарь с данными о вакансиях или {} после исчерпания повторов
+        """
+        assert self._client is not None, "HHCrawler нужно использовать как async with"
+        url = f"{self.base_url}/vacancies"
+        params: Dict[str, Any] = {"text": query, "page": page, "per_page": per_page}
+        if area:
+            params["area"] = area
+        if date_from:
+            params["date_from"] = date_from
+
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            response: Optional[httpx.Response] = None
+            error: Optional[str] = None
+            async with self._host_limit(url):
+                self.progress.requests += 1
+                try:
+                    response = await self._client.get(url, params=params)
+                except httpx.TransportError as exception:
+                    error = str(exception) or type(exception).__name__
+
+            if response is not None:
+                if response.status_code < 400:
+                    self.progress.pages += 1
+                    return response.json()
+                error = f"HTTP {response.status_code}"
+                if response.status_code not in RETRY_STATUSES:
+                    break
+
+            if attempt == self.max_retries:
+                break
+            delay = self._retry_delay(attempt, response)
+            if response is not None and response.status_code == 429:
+                # Сервер просит сбавить темп — притормаживаем весь краулер, а не один запрос
+                self.bucket.pause(delay)
+            self.progress.retries += 1
+            await asyncio.sleep(delay)
+
+        self.progress.errors += 1
+        self._failed_queries[query] += 1
+        print(f"Ошибка при запросе для '{query}' (страница {page}, регион {area}): {error}")
+        return {}
+
+    async def _page(
+        self, query: str, page: int, area: Optional[int] = None, date_from: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Страница из чекпоинта, а если её там нет — из API с записью в чекпоинт
+        """
+        if self.state is not None:
+            data = await asyncio.to_thread(self.state.get_page, query, area, page)
+            if data is not None:
+                self.progress.resumed_pages += 1
+                return data
+
+        data = await self.get_vacancies(query, page=page, area=area, date_from=date_from)
+        if data and self.state is not None:
+            await asyncio.to_thread(self.state.put_page, query, area, page, data)
+        return data
+
+    def _emit(self, page_data: Dict[str, Any], on_page: PageCallback) -> int:
+        vacancies = [parse_vacancy(vacancy) for vacancy in page_data.get("items", [])]
+        self.progress.vacancies += len(vacancies)
+        on_page(vacancies)
+        return len(vacancies)
+
+    async def _fetch_pages(
+        self,
+        query: str,
+        first_page_data: Dict[str, Any],
+        on_page: PageCallback,
+        area: Optional[int] = None,
+        date_from: Optional[str] = None,
+    ) -> int:
+        """
+        Отдаёт первую страницу и параллельно догружает остальные
+
+        Каждая страница передаётся в on_page сразу по приходу (в порядке
+        готовности), поэтому в памяти не копится весь обход.
+
+        Returns:
+            Сколько вакансий было на страницах (до дедупликации)
+        """
+        total_pages = min(first_page_data.get("pages", 1), MAX_RESULTS // PER_PAGE)
+
+        async def fetch(page: int) -> int:
+            page_data = await self._page(query, page, area=area, date_from=date_from)
+            return self._emit(page_data, on_page)
+
+        counts = await asyncio.gather(*(fetch(page) for page in range(1, total_pages)))
+        return self._emit(first_page_data, on_page) + sum(counts)
+
+    async def _stream_area(
+        self, query: str, area: int, area_name: str, on_page: PageCallback, date_from: Optional[str] = None
+    ) -> int:
+        first_page_data = await self._page(query, 0, area=area, date_from=date_from)
+        found = first_page_data.get("found", 0) if first_page_data else 0
+        if found == 0:
+            return 0
+
+        count = await self._fetch_pages(query, first_page_data, on_page, area=area, date_from=date_from)
+        area_label = f" ({area_name})" if area_name else f" (регион {area})"
+        print(f"  {query}{area_label}: получено {count} из {found} вакансий")
+        return count
+
+    async def stream_profession(
+        self,
+        query: str,
+        on_page: PageCallback,
+        parse_all: bool = True,
+        use_areas: bool = True,
+        date_from: Optional[str] = None,
+    ) -> int:
+        """
+        Обходит профессию, передавая в on_page разобранные вакансии каждой страницы
+
+        Если найдено больше 2000 вакансий, регионы из AREAS обходятся
+        параллельно; повторы между регионами отсеивает on_page.
+
+        Returns:
+            Сколько вакансий нашёл API
+        """
+        first_page_data = await self._page(query, 0, date_from=date_from)
+        if not first_page_data:
+            return 0
+
+        found = first_page_data.get("found", 0)
+        if not parse_all:
+            self._emit(first_page_data, on_page)
+        elif found > MAX_RESULTS and use_areas:
+            print(f"Профессия: {query} - Найдено вакансий: {found}, обходим {len(AREAS)} регионов параллельно")
+            await asyncio.gather(
+                *(
+                    self._stream_area(query, area_id, area_name, on_page, date_from=date_from)
+                    for area_id, area_name in AREAS
+                )
+            )
+        else:
+            await self._fetch_pages(query, first_page_data, on_page, date_from=date_from)
+        return found
+
+    async def get_vacancies_by_area(
+        self, query: str, area: int, area_name: str = "", date_from: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Асинхронный аналог test_api.get_vacancies_by_area
+        """
+        vacancies: List[Dict[str, Any]] = []
+        await self._stream_area(query, area, area_name, vacancies.extend, date_from=date_from)
+        return vacancies
+
+    async def get_all_vacancies_for_profession(
+        self, query: str, parse_all: bool = True, use_areas: bool = True, date_from: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Асинхронный аналог test_api.get_all_vacancies_for_profession (всё в памяти)
+        """
+        vacancies: List[Dict[str, Any]] = []
+        found = await self.stream_profession(
+            query, vacancies.extend, parse_all=parse_all, use_areas=use_areas, date_from=date_from
+        )
+        vacancies = remove_duplicates(vacancies)
+        print(f"Получено {len(vacancies)} уникальных вакансий для '{query}' (из {found} найденных)")
+        return vacancies
+
+    async def _crawl_to_json(
+        self, profession: str, parse_all: bool, save_to_folders: bool, date_from: Optional[str]
+    ) -> Dict[str, Any]:
+        """
+        Старый формат: вакансии профессии собираются в памяти и пишутся в data.json
+        """
+        vacancies = await self.get_all_vacancies_for_profession(profession, parse_all=parse_all, date_from=date_from)
+        if date_from is not None:
+            previous = await asyncio.to_thread(load_profession_data, profession)
+            # Новые версии вакансий идут первыми и вытесняют старые при дедупликации
+            merged = remove_duplicates(vacancies + previous)
+            print(f"'{profession}': {len(merged) - len(previous)} новых вакансий с {date_from}")
+            vacancies = merged
+        if save_to_folders and vacancies:
+            await asyncio.to_thread(save_profession_data, profession, vacancies)
+        return {"count": len(vacancies), "vacancies": vacancies}
+
+    async def _crawl_to_jsonl(
+        self, profession: str, parse_all: bool, storage_format: str, date_from: Optional[str]
+    ) -> Dict[str, Any]:
+        """
+        Потоковый формат: страницы дописываются в vacancies.<storage_format> по мере прихода
+        """
+        folder = Path(create_profession_folder(profession))
+        path = folder / f"{JSONL_BASENAME}.{storage_format}"
+        previous = find_profession_file(folder) if date_from is not None else None
+
+        with VacancyWriter(path) as writer:
+            found = await self.stream_profession(profession, writer.write_many, parse_all=parse_all, date_from=date_from)
+            fresh = writer.count
+            if previous is not None:
+                # Новые версии вакансий записаны первыми, старые дописываются без повторов
+                await asyncio.to_thread(writer.write_many, iter_vacancies(previous))
+                print(f"'{profession}': {fresh} новых вакансий с {date_from}")
+
+        if previous is not None and previous != path and previous.name.startswith(JSONL_BASENAME):
+            # Сменили формат сжатия — старый файл теперь целиком внутри нового
+            previous.unlink()
+        print(f"Получено {fresh} уникальных вакансий для '{profession}' (из {found} найденных) -> {path}")
+        return {"count": writer.count, "file": str(path)}
+
+    async def get_vacancies_for_professions(
+        self,
+        professions: List[str],
+        parse_all: bool = True,
+        save_to_folders: bool = True,
+        concurrency: int = 4,
+        progress_interval: float = 10.0,
+        incremental: bool = False,
+        storage_format: str = "json",
+    ) -> Dict[str, Any]:
+        """
+        Асинхронный аналог test_api.get_vacancies_for_professions
+
+        Args:
+            professions: Список названий профессий
+            parse_all: Если True, парсит ВСЕ найденные страницы для каждой профессии
+            save_to_folders: Сохранять ли данные в отдельные папки для каждой профессии
+            concurrency: Сколько профессий обходить одновременно
+            progress_interval: Как часто печатать прогресс, секунды (0 — не печатать)
+            incremental: Запрашивать только вакансии новее последнего успешного обхода
+                и сливать их с уже сохранёнными (нужен state)
+            storage_format: "json" — как в test_api (data.json, вакансии в результате);
+                "jsonl", "jsonl.gz", "jsonl.zst" — потоковая запись в папку профессии,
+                в результате только число вакансий и путь к файлу
+
+        Returns:
+            Словарь с данными по всем профессиям
+        """
+        if storage_format != "json" and storage_format not in STORAGE_FORMATS:
+            raise ValueError(f"Неизвестный формат хранения: {storage_format}")
+        streaming = storage_format != "json"
+        self.progress.professions_total = len(professions)
+        result: Dict[str, Any] = {"professions_count": len(professions), "total_vacancies": 0, "data": {}}
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def crawl_one(profession: str) -> Tuple[str, Dict[str, Any]]:
+            state = self.state
+            if state is not None and await asyncio.to_thread(state.is_profession_done, profession):
+                # Профессия уже сохранена в прерванном запуске
+                self.progress.professions_done += 1
+                return profession, await asyncio.to_thread(self._saved_profession, profession, streaming)
+
+            date_from = state.last_success(profession) if incremental and state is not None else None
+            async with semaphore:
+                if streaming:
+                    entry = await self._crawl_to_jsonl(profession, parse_all, storage_format, date_from)
+                else:
+                    entry = await self._crawl_to_json(profession, parse_all, save_to_folders, date_from)
+
+            saved = streaming or (save_to_folders and entry["count"] > 0)
+            if saved and state is not None and not self._failed_queries[profession]:
+                await asyncio.to_thread(state.mark_profession_done, profession)
+            self.progress.professions_done += 1
+            return profession, entry
+
+        reporter = asyncio.create_task(self._report_progress(progress_interval)) if progress_interval > 0 else None
+        try:
+            for profession, entry in await asyncio.gather(*(crawl_one(profession) for profession in professions)):
+                result["data"][profession] = entry
+                result["total_vacancies"] += entry["count"]
+        finally:
+            if reporter is not None:
+                reporter.cancel()
+        print(self.progress.format())
+
+        failed = [profession for profession in professions if self._failed_queries[profession]]
+        if failed:
+            print(f"Не все страницы получены для {len(failed)} профессий — перезапустите с --resume")
+        elif self.state is not None and (save_to_folders or streaming):
+            await asyncio.to_thread(self.state.finish_run)
+        return result
+
+    @staticmethod
+    def _saved_profession(profession: str, streaming: bool) -> Dict[str, Any]:
+        if not streaming:
+            vacancies = load_profession_data(profession)
+            return {"count": len(vacancies), "vacancies": vacancies}
+        path = find_profession_file(create_profession_folder(profession))
+        if path is None:
+            return {"count": 0, "file": None}
+        return {"count": sum(1 for _ in iter_vacancies(path)), "file": str(path)}
+
+    async def _report_progress(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            print(self.progress.format())
+
+
+def main():
+    """
+    Параллельный парсинг вакансий по списку профессий
+    """
+    parser = argparse.ArgumentParser(description="Асинхронный парсинг вакансий HeadHunter")
+    parser.add_argument("--professions", nargs="+", default=PROFESSIONS, help="Профессии (по умолчанию — все из test_api)")
+    parser.add_argument("--base-url", default=HH_API_URL, help="Адрес API (или локальной заглушки)")
+    parser.add_argument("--rate", type=float, default=float(os.getenv("HH_RATE", 5)), help="Запросов в секунду")
+    parser.add_argument("--burst", type=int, default=int(os.getenv("HH_BURST", 10)), help="Запросов подряд без ожидания")
+    parser.add_argument("--max-per-host", type=int, default=int(os.getenv("HH_MAX_PER_HOST", 8)))
+    parser.add_argument("--concurrency", type=int, default=4, help="Профессий одновременно")
+    parser.add_argument("--no-save", action="store_true", help="Не сохранять данные по папкам профессий")
+    parser.add_argument("--state", type=Path, default=DEFAULT_STATE_PATH, help="Файл чекпоинта обхода")
+    parser.add_argument("--resume", action="store_true", help="Продолжить прерванный обход")
+    parser.add_argument("--incremental", action="store_true", help="Только новые вакансии с прошлого обхода")
+    parser.add_argument(
+        "--format",
+        choices=("json",) + STORAGE_FORMATS,
+        default="jsonl",
+        help="json — data.json целиком в памяти; jsonl[.gz|.zst] — потоковая запись",
+    )
+    args = parser.parse_args()
+
+    state = CrawlState(args.state, resume=args.resume)
+    if state.resumed:
+        print(f"Продолжаем обход, начатый {state.run_started_at}: {state.stats()}")
+
+    async def run() -> Dict[str, Any]:
+        async with HHCrawler(
+            args.base_url, rate=args.rate, burst=args.burst, max_per_host=args.max_per_host, state=state
+        ) as crawler:
+            return await crawler.get_vacancies_for_professions(
+                args.professions,
+                save_to_folders=not args.no_save,
+                concurrency=args.concurrency,
+                incremental=args.incremental,
+                storage_format=args.format,
+            )
+
+    try:
+        result_data = asyncio.run(run())
+    finally:
+        state.close()
+    print(f"Всего профессий обработано: {result_data['professions_count']}")
+    print(f"Всего вакансий получено: {result_data['total_vacancies']}")
+    return result_data
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Локальная заглушка API HeadHunter (/vacancies) для проверки краулера
+
+Отдаёт детерминированные вакансии: число найденных зависит от запроса и
+региона, у общероссийского региона (113) часть вакансий совпадает с
+региональными, чтобы работала дедупликация. Умеет имитировать задержку,
+429 с Retry-After и 503.
+
+Запуск:
+    python hh_stub_server.py --port 8765 --latency 0.05 --error-rate 0.05
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+MAX_RESULTS = 2000
+# Вакансии заглушки опубликованы в 2024 году (см. _vacancy)
+LAST_PUBLISHED = "2024-12-31"
+
+
+def _seed(*parts: Any) -> int:
+    return int(hashlib.sha1("|".join(map(str, parts)).encode("utf-8")).hexdigest()[:8], 16)
+
+
+def _found(query: str, area: Optional[str]) -> int:
+    if area is None:
+        # Без региона популярные запросы превышают лимит API — краулер пойдёт по регионам
+        return 500 + _seed(query) % 5000
+    return _seed(query, area) % 1800
+
+
+def _vacancy(query: str, area: Optional[str], index: int) -> Dict[str, Any]:
+    # Каждая пятая вакансия региона — «общая» и встречается в нескольких регионах
+    shared = index % 5 == 0
+    vacancy_id = str(_seed(query, "shared" if shared else area, index))
+    published_at = datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(hours=_seed(vacancy_id) % 8000)
+    salary_from = 30_000 + _seed(vacancy_id, "salary") % 200_000
+    return {
+        "id": vacancy_id,
+        "name": f"{query} #{index}",
+        "employer": {"id": str(_seed(vacancy_id, "employer") % 1000), "name": f"Компания {index % 37}"},
+        "salary": {"from": salary_from, "to": salary_from + 20_000, "currency": "RUR"},
+        "area": {"id": area or "113", "name": f"Регион {area or 113}"},
+        "experience": {"name": "От 1 года до 3 лет"},
+        "schedule": {"name": "Полный день"},
+        "employment": {"name": "Полная занятость"},
+        "published_at": published_at.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "alternate_url": f"https://hh.ru/vacancy/{vacancy_id}",
+        "snippet": {"requirement": f"Опыт работы: {query}", "responsibility": "Делать хорошо"},
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    error_rate = 0.0
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        if url.path != "/vacancies":
+            self._send(404, {"description": "Not Found"})
+            return
+
+        if self.latency:
+            time.sleep(self.latency)
+        roll = random.random()
+        if roll < self.error_rate / 2:
+            self._send(429, {"description": "Too Many Requests"}, {"Retry-After": "1"})
+            return
+        if roll < self.error_rate:
+            self._send(503, {"description": "Service Unavailable"})
+            return
+
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        query = params.get("text", "")
+        area = params.get("area")
+        page = int(params.get("page", 0))
+        per_page = min(int(params.get("per_page", 20)), 100)
+        if page * per_page >= MAX_RESULTS:
+            self._send(400, {"description": "Bad Request", "errors": [{"type": "bad_argument", "value": "page"}]})
+            return
+
+        found = _found(query, area)
+        date_from = params.get("date_from")
+        if date_from and date_from[:10] > LAST_PUBLISHED:
+            # Все вакансии заглушки старше date_from (инкрементальный обход)
+            found = 0
+        items = [_vacancy(query, area, index) for index in range(page * per_page, page * per_page + per_page)]
+        items = items[: max(0, found - page * per_page)]
+        if date_from:
+            items = [item for item in items if item["published_at"][:10] >= date_from[:10]]
+        self._send(
+            200,
+            {
+                "items": items,
+                "found": found,
+                "pages": min(-(-found // per_page), MAX_RESULTS // per_page),
+                "page": page,
+                "per_page": per_page,
+            },
+        )
+
+    def _send(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Заглушка API HeadHunter для краулера")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Задержка ответа, секунды")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Доля ответов 429/503")
+    args = parser.parse_args()
+
+    StubHandler.latency = args.latency
+    StubHandler.error_rate = args.error_rate
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    print(f"Заглушка HeadHunter API: http://{args.host}:{args.port}/vacancies")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,14 @@
+import argparse
 import json
 import os
-from typing import Dict, List, Any
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Any, Optional, Set, Tuple, Union
 from pathlib import Path
 
+from vacancy_store import STORAGE_FORMATS, find_profession_file, iter_vacancies, open_text
+
 
 def load_json_file(filepath: str) -> Dict[str, Any]:
     """
@@ -24,7 +30,7 @@ def load_json_file(filepath: str) -> Dict[str, Any]:
 
 def find_all_data_files(base_folder: str = "parsed_jobs") -> List[tuple]:
     """
-    Находит все файлы data.json в папках профессий
+    Находит файлы с вакансиями в папках профессий (vacancies.jsonl[.gz|.zst] или data.json)
     
     Args:
         base_folder: Базовая папка с данными
@@ -44,11 +50,11 @@ def find_all_data_files(base_folder: str = "parsed_jobs") -> List[tuple]:
         
         # Проверяем, что это папка
         if os.path.isdir(folder_path):
-            data_file = os.path.join(folder_path, "data.json")
+            data_file = find_profession_file(folder_path)
             
-            # Проверяем, существует ли data.json
-            if os.path.exists(data_file):
-                data_files.append((data_file, folder_name))
+            # Проверяем, есть ли в папке данные
+            if data_file is not None:
+                data_files.append((str(data_file), folder_name))
     
     return data_files
 
@@ -92,7 +98,10 @@ def merge_all_vacancies(base_folder: str = "parsed_jobs", output_file: str = "al
     print("\nЗагружаю и объединяю данные...")
     
     for filepath, profession in data_files:
-        data = load_json_file(filepath)
+        if filepath.endswith(".json"):
+            data = load_json_file(filepath)
+        else:
+            data = {"vacancies": list(iter_vacancies(filepath))}
         
         if not data:
             continue
@@ -139,14 +148,251 @@ def merge_all_vacancies(base_folder: str = "parsed_jobs", output_file: str = "al
     return merged_data
 
 
+def _compact_id(vacancy_id: Any) -> Union[int, str]:
+    """
+    ID вакансии HeadHunter — строка из цифр; int в множестве занимает в разы меньше памяти
+    """
+    if isinstance(vacancy_id, str) and vacancy_id.isdigit():
+        return int(vacancy_id)
+    return vacancy_id
+
+
+class _MergeOutput:
+    """
+    Потоковая запись объединённых вакансий (уже сериализованных в строку JSON)
+
+    Для .jsonl[.gz|.zst] — JSON Lines, иначе JSON той же структуры, что у
+    merge_all_vacancies (all_vacancies идёт первым). Файл пишется под
+    временным именем и переименовывается в close.
+    """
+
+    def __init__(self, output_file: str):
+        self.output_file = output_file
+        self.as_jsonl = any(output_file.endswith(f".{storage_format}") for storage_format in STORAGE_FORMATS)
+        self.written = 0
+        # Префикс, а не суффикс: расширение определяет сжатие
+        folder, name = os.path.split(output_file)
+        self._tmp_file = os.path.join(folder, f".tmp-{name}")
+        self._file = open_text(self._tmp_file, "wt")
+        if not self.as_jsonl:
+            self._file.write('{"all_vacancies": [')
+
+    def write(self, vacancy_json: str) -> None:
+        if self.as_jsonl:
+            self._file.write(vacancy_json)
+            self._file.write("\n")
+        else:
+            self._file.write(",\n" if self.written else "\n")
+            self._file.write(vacancy_json)
+        self.written += 1
+
+    def close(self, summary: Dict[str, Any]) -> None:
+        if not self.as_jsonl:
+            self._file.write("\n]")
+            for key in ("total_professions", "total_vacancies", "professions"):
+                self._file.write(f",\n{json.dumps(key)}: {json.dumps(summary[key], ensure_ascii=False)}")
+            self._file.write("}\n")
+        self._file.close()
+        os.replace(self._tmp_file, self.output_file)
+
+
+def _print_merge_summary(summary: Dict[str, Any], output_file: str) -> None:
+    print("\n" + "="*60)
+    print(f"Всего профессий: {summary['total_professions']}")
+    print(f"Всего уникальных вакансий: {summary['total_vacancies']}")
+    print(f"\n✅ Объединенный файл сохранен: {output_file}")
+    print("="*60)
+
+
+def merge_all_vacancies_streaming(base_folder: str = "parsed_jobs", output_file: str = "all_vacancies.json") -> Dict[str, Any]:
+    """
+    Объединяет вакансии потоково, не загружая их в память
+
+    Входные файлы читаются по одной вакансии (JSONL построчно, data.json через
+    ijson), дубликаты отсеиваются по множеству ID, вакансии сразу пишутся на
+    диск. Если output_file — .jsonl[.gz|.zst], пишется JSON Lines; иначе JSON
+    той же структуры, что у merge_all_vacancies (all_vacancies идёт первым).
+
+    Args:
+        base_folder: Базовая папка с данными
+        output_file: Имя выходного файла
+
+    Returns:
+        Сводка без самих вакансий: total_professions, total_vacancies, professions
+    """
+    print("="*60)
+    print("ПОТОКОВОЕ ОБЪЕДИНЕНИЕ ВАКАНСИЙ")
+    print("="*60)
+
+    data_files = find_all_data_files(base_folder)
+    if not data_files:
+        print(f"\n❌ Не найдено ни одного файла с вакансиями в папке {base_folder}")
+        return {}
+
+    print(f"\nНайдено {len(data_files)} файлов для объединения")
+
+    summary = {
+        "total_professions": len(data_files),
+        "total_vacancies": 0,
+        "professions": {},
+    }
+    seen_ids: Set[Union[int, str]] = set()
+    output = _MergeOutput(output_file)
+
+    for filepath, profession in data_files:
+        count = 0
+        for vacancy in iter_vacancies(filepath):
+            count += 1
+            vacancy_id = vacancy.get("id")
+            if vacancy_id and _is_new(vacancy_id, seen_ids):
+                output.write(json.dumps(vacancy, ensure_ascii=False))
+        summary["professions"][profession] = {"count": count, "source_folder": profession}
+        print(f"  {profession}: {count} вакансий")
+
+    summary["total_vacancies"] = output.written
+    output.close(summary)
+    _print_merge_summary(summary, output_file)
+    return summary
+
+
+def _is_new(vacancy_id: Any, seen_ids: Set[Union[int, str]]) -> bool:
+    compact = _compact_id(vacancy_id)
+    if compact in seen_ids:
+        return False
+    seen_ids.add(compact)
+    return True
+
+
+def _parse_profession_file(task: Tuple[int, str, str, str]) -> Dict[str, Any]:
+    """
+    Работа процесса-воркера: разбирает файл профессии и сохраняет вакансии
+    в промежуточный JSONL вместе со списком их ID (в том же порядке)
+    """
+    index, filepath, profession, tmp_dir = task
+    part_file = os.path.join(tmp_dir, f"{index:05d}.jsonl")
+    ids: List[Any] = []
+    count = 0
+    with open(part_file, "w", encoding="utf-8") as part:
+        for vacancy in iter_vacancies(filepath):
+            count += 1
+            vacancy_id = vacancy.get("id")
+            if not vacancy_id:
+                continue
+            ids.append(vacancy_id)
+            part.write(json.dumps(vacancy, ensure_ascii=False))
+            part.write("\n")
+    return {"index": index, "profession": profession, "count": count, "ids": ids, "part_file": part_file}
+
+
+def merge_all_vacancies_parallel(
+    base_folder: str = "parsed_jobs",
+    output_file: str = "all_vacancies.json",
+    workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Объединяет вакансии, разбирая файлы профессий параллельно в нескольких процессах
+
+    Воркеры декодируют JSON (самая дорогая часть) и пишут вакансии в
+    промежуточные файлы. Основной процесс проходит по результатам строго в
+    порядке find_all_data_files и копирует строки без повторного разбора,
+    оставляя первое вхождение каждого ID — результат совпадает с
+    merge_all_vacancies_streaming.
+
+    Args:
+        base_folder: Базовая папка с данными
+        output_file: Имя выходного файла (.json или .jsonl[.gz|.zst])
+        workers: Число процессов (по умолчанию — число ядер)
+
+    Returns:
+        Сводка без самих вакансий: total_professions, total_vacancies, professions
+    """
+    print("="*60)
+    print("ПАРАЛЛЕЛЬНОЕ ОБЪЕДИНЕНИЕ ВАКАНСИЙ")
+    print("="*60)
+
+    data_files = find_all_data_files(base_folder)
+    if not data_files:
+        print(f"\n❌ Не найдено ни одного файла с вакансиями в папке {base_folder}")
+        return {}
+
+    workers = workers or os.cpu_count() or 1
+    print(f"\nНайдено {len(data_files)} файлов, процессов: {workers}")
+
+    summary = {
+        "total_professions": len(data_files),
+        "total_vacancies": 0,
+        "professions": {},
+    }
+    seen_ids: Set[Union[int, str]] = set()
+    output = _MergeOutput(output_file)
+    ready: Dict[int, Dict[str, Any]] = {}
+    next_index = 0
+    parsed_files = parsed_vacancies = 0
+    started = time.perf_counter()
+
+    with tempfile.TemporaryDirectory(prefix="merge_json_") as tmp_dir, ProcessPoolExecutor(max_workers=workers) as pool:
+        tasks = [(index, filepath, profession, tmp_dir) for index, (filepath, profession) in enumerate(data_files)]
+        futures = [pool.submit(_parse_profession_file, task) for task in tasks]
+        for future in as_completed(futures):
+            part = future.result()
+            ready[part["index"]] = part
+            parsed_files += 1
+            parsed_vacancies += part["count"]
+            elapsed = max(time.perf_counter() - started, 1e-9)
+            print(
+                f"  [{parsed_files}/{len(data_files)}] {part['profession']}: {part['count']} вакансий "
+                f"({parsed_files / elapsed:.1f} файлов/с, {parsed_vacancies / elapsed:.0f} вакансий/с)"
+            )
+
+            # Дедупликация идёт строго по порядку файлов, как только готов следующий
+            while next_index in ready:
+                part = ready.pop(next_index)
+                with open(part["part_file"], "r", encoding="utf-8") as lines:
+                    for vacancy_id, line in zip(part["ids"], lines):
+                        if _is_new(vacancy_id, seen_ids):
+                            output.write(line.rstrip("\n"))
+                os.remove(part["part_file"])
+                summary["professions"][part["profession"]] = {
+                    "count": part["count"],
+                    "source_folder": part["profession"],
+                }
+                next_index += 1
+
+    summary["total_vacancies"] = output.written
+    output.close(summary)
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    print(
+        f"\nРазобрано {parsed_files} файлов и {parsed_vacancies} вакансий за {elapsed:.1f} c "
+        f"({parsed_files / elapsed:.1f} файлов/с, {parsed_vacancies / elapsed:.0f} вакансий/с)"
+    )
+    _print_merge_summary(summary, output_file)
+    return summary
+
+
 def main():
     """
     Основная функция для объединения JSON файлов
     """
+    parser = argparse.ArgumentParser(description="Объединение вакансий из parsed_jobs")
+    parser.add_argument("--base-folder", default="parsed_jobs")
+    parser.add_argument("--output", default="all_vacancies.json", help="Выходной файл (.json или .jsonl[.gz|.zst])")
+    parser.add_argument("--in-memory", action="store_true", help="Старый режим: всё в памяти, JSON с отступами")
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Процессов для разбора файлов (0 — по числу ядер, 1 — без пула)"
+    )
+    args = parser.parse_args()
+
+    if args.in_memory:
+        return merge_all_vacancies(base_folder=args.base_folder, output_file=args.output)
+    if args.workers != 1:
+        return merge_all_vacancies_parallel(
+            base_folder=args.base_folder, output_file=args.output, workers=args.workers or None
+        )
+
     # Объединяем все вакансии
-    result = merge_all_vacancies(
-        base_folder="parsed_jobs",
-        output_file="all_vacancies.json"
+    result = merge_all_vacancies_streaming(
+        base_folder=args.base_folder,
+        output_file=args.output
     )
     
     return result
@@ -1,14 +1,26 @@
 from __future__ import annotations
 
+import asyncio
+import json
+import logging
 import os
 from functools import lru_cache
-from typing import Any, List, Literal
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Literal
 
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from gradio_client import Client
 from pydantic import BaseModel, Field
 
+from picture_ai.upstream import UpstreamBusyError, UpstreamPool
+from text_ai.call_hf_endpoint import ENDPOINT_URL, SYSTEM_PROMPT
 from text_ai.call_hf_endpoint import chat as hf_chat
+from text_ai.call_hf_endpoint import chat_stream as hf_chat_stream
+from text_ai.context import CompactionResult, HistoryCompactor, estimate_tokens
+from text_ai.response_cache import DEFAULT_CACHE_PATH, ResponseCache, cache_key
+
+logger = logging.getLogger(__name__)
 
 DEFAULT_NEGATIVE_PROMPT = (
     "bad quality, worst quality, low quality, blurry, low details, bad anatomy, "
@@ -45,10 +57,17 @@ class ChatRequest(BaseModel):
     max_new_tokens: int = Field(default=512, ge=64, le=1024)
     temperature: float = Field(default=0.7, ge=0.0, le=1.0)
     top_p: float = Field(default=0.9, ge=0.1, le=1.0)
+    allow_cached: bool = Field(
+        default=False, description="Можно ли вернуть сохранённый ответ на такой же запрос"
+    )
 
 
 class ChatResponse(BaseModel):
     text: str = Field(..., description="Ответ ассистента")
+    prompt_tokens_saved: int = Field(
+        default=0, description="Сколько токенов промпта сэкономило сжатие истории"
+    )
+    cached: bool = Field(default=False, description="Ответ взят из кэша")
 
 
 @lru_cache(maxsize=1)
@@ -61,6 +80,38 @@ def _get_client() -> Client:
 
 app = FastAPI(title="Picture AI Proxy", version="1.0.0")
 
+# Отдельные пулы, чтобы долгая генерация картинки не блокировала чат
+_IMAGE_POOL = UpstreamPool.from_env("image", default_concurrency=2)
+_TEXT_POOL = UpstreamPool.from_env("text", default_concurrency=8)
+
+# История укладывается в бюджет промпта вместе с системным промптом
+_COMPACTOR = HistoryCompactor(
+    budget_tokens=int(os.getenv("CHAT_PROMPT_TOKEN_BUDGET", 3072)),
+    reserved_tokens=estimate_tokens(SYSTEM_PROMPT),
+    summarize=os.getenv("CHAT_SUMMARIZE_DROPPED", "").strip().lower() in {"1", "true", "yes", "on"},
+)
+_RESPONSE_CACHE = ResponseCache(
+    max_entries=int(os.getenv("TEXT_CACHE_SIZE", 512)),
+    ttl=float(os.getenv("TEXT_CACHE_TTL", 24 * 60 * 60)),
+    db_path=Path(os.getenv("TEXT_CACHE_PATH", DEFAULT_CACHE_PATH)),
+)
+
+
+@app.on_event("shutdown")
+def _shutdown_pools() -> None:
+    _IMAGE_POOL.shutdown()
+    _TEXT_POOL.shutdown()
+    _RESPONSE_CACHE.close()
+
+
+@app.get("/metrics", response_model=Dict[str, Any])
+def metrics() -> Dict[str, Any]:
+    return {
+        "upstreams": {"image": _IMAGE_POOL.stats(), "text": _TEXT_POOL.stats()},
+        "context": _COMPACTOR.stats(),
+        "response_cache": _RESPONSE_CACHE.stats(),
+    }
+
 
 def _extract_url(result: Any) -> str:
     """Пытаемся достать URL из различных форматов ответа gradio_client."""
@@ -130,7 +181,8 @@ async def generate_image(payload: ImageRequest) -> ImageResponse:
     client = _get_client()
 
     try:
-        prediction = client.predict(
+        prediction = await _IMAGE_POOL.run(
+            client.predict,
             prompt=payload.prompt,
             negative_prompt=payload.negative_prompt,
             steps=payload.steps,
@@ -140,6 +192,8 @@ async def generate_image(payload: ImageRequest) -> ImageResponse:
             seed=payload.seed,
             api_name="/generate_image",
         )
+    except UpstreamBusyError as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
     except Exception as exc:  # pragma: no cover - proxied external errors
         raise HTTPException(status_code=502, detail=f"Image generation failed: {exc}") from exc
 
@@ -147,17 +201,98 @@ async def generate_image(payload: ImageRequest) -> ImageResponse:
     return ImageResponse(url=image_url)
 
 
+def _compact_messages(payload: ChatRequest) -> CompactionResult:
+    compaction = _COMPACTOR.compact([message.model_dump() for message in payload.messages])
+    if compaction.dropped_messages:
+        logger.info(
+            "Chat history compacted: dropped %s messages, saved ~%s prompt tokens",
+            compaction.dropped_messages,
+            compaction.saved_tokens,
+        )
+    return compaction
+
+
+def _response_cache_key(payload: ChatRequest) -> str:
+    return cache_key(
+        [message.model_dump() for message in payload.messages],
+        model=ENDPOINT_URL,
+        max_new_tokens=payload.max_new_tokens,
+        temperature=payload.temperature,
+        top_p=payload.top_p,
+        system_prompt=SYSTEM_PROMPT,
+    )
+
+
 @app.post("/text/chat", response_model=ChatResponse)
 async def generate_text(payload: ChatRequest) -> ChatResponse:
+    key = _response_cache_key(payload) if payload.allow_cached else None
+    if key is not None:
+        cached = await asyncio.to_thread(_RESPONSE_CACHE.get, key)
+        if cached is not None:
+            return ChatResponse(text=cached, cached=True)
+
+    compaction = _compact_messages(payload)
     try:
-        result = hf_chat(
-            messages=[message.model_dump() for message in payload.messages],
+        result = await _TEXT_POOL.run(
+            hf_chat,
+            messages=compaction.messages,
             max_new_tokens=payload.max_new_tokens,
             temperature=payload.temperature,
             top_p=payload.top_p,
         )
+    except UpstreamBusyError as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
     except Exception as exc:  # pragma: no cover - внешние ошибки
         raise HTTPException(status_code=502, detail=f"Text generation failed: {exc}") from exc
 
     text = _extract_text(result)
-    return ChatResponse(text=text)
+    if key is not None:
+        await asyncio.to_thread(_RESPONSE_CACHE.put, key, text)
+    return ChatResponse(text=text, prompt_tokens_saved=compaction.saved_tokens)
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/text/chat/stream")
+async def generate_text_stream(payload: ChatRequest) -> StreamingResponse:
+    """Тот же чат, но токены отдаются по мере генерации (Server-Sent Events)."""
+
+    key = _response_cache_key(payload) if payload.allow_cached else None
+    compaction = _compact_messages(payload)
+
+    async def events() -> AsyncIterator[str]:
+        if key is not None:
+            cached = await asyncio.to_thread(_RESPONSE_CACHE.get, key)
+            if cached is not None:
+                yield _sse("token", {"text": cached})
+                yield _sse("done", {"prompt_tokens_saved": 0, "cached": True})
+                return
+
+        tokens: List[str] = []
+        try:
+            async for token in _TEXT_POOL.stream(
+                hf_chat_stream,
+                messages=compaction.messages,
+                max_new_tokens=payload.max_new_tokens,
+                temperature=payload.temperature,
+                top_p=payload.top_p,
+            ):
+                tokens.append(token)
+                yield _sse("token", {"text": token})
+        except UpstreamBusyError as exc:
+            yield _sse("error", {"detail": str(exc)})
+            return
+        except Exception as exc:  # pragma: no cover - внешние ошибки
+            yield _sse("error", {"detail": f"Text generation failed: {exc}"})
+            return
+        if key is not None:
+            await asyncio.to_thread(_RESPONSE_CACHE.put, key, "".join(tokens))
+        yield _sse("done", {"prompt_tokens_saved": compaction.saved_tokens, "cached": False})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
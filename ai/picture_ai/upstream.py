@@ -0,0 +1,136 @@
+"""Ограниченные пулы потоков для синхронных вызовов внешних сервисов."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+_STREAM_END = object()
+
+
+class UpstreamBusyError(RuntimeError):
+    """Очередь к внешнему сервису переполнена."""
+
+
+class UpstreamPool:
+    """Выносит блокирующие вызовы одного upstream в отдельный пул потоков.
+
+    Одновременно выполняется не больше ``max_concurrency`` вызовов, остальные
+    ждут в очереди (её длину можно ограничить ``max_queue``). Так медленная
+    генерация картинки не занимает event loop и не мешает текстовому чату.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: Optional[int] = None) -> None:
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix=f"upstream-{name}"
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._queued = 0
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+
+    @classmethod
+    def from_env(cls, name: str, default_concurrency: int) -> "UpstreamPool":
+        prefix = name.upper()
+        max_queue = os.getenv(f"{prefix}_MAX_QUEUE")
+        return cls(
+            name,
+            max_concurrency=int(os.getenv(f"{prefix}_MAX_CONCURRENCY", default_concurrency)),
+            max_queue=int(max_queue) if max_queue else None,
+        )
+
+    async def _acquire(self) -> None:
+        if self.max_queue is not None and self._queued >= self.max_queue:
+            self._rejected += 1
+            raise UpstreamBusyError(f"Upstream '{self.name}' queue is full")
+
+        self._queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._queued -= 1
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        await self._acquire()
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+        except Exception:
+            self._failed += 1
+            raise
+        else:
+            self._completed += 1
+            return result
+        finally:
+            self._in_flight -= 1
+            self._semaphore.release()
+
+    async def stream(
+        self, func: Callable[..., Iterator[T]], *args: Any, **kwargs: Any
+    ) -> AsyncIterator[T]:
+        """Как ``run``, но для синхронного генератора: элементы отдаются по мере готовности.
+
+        Слот пула занят, пока генератор не исчерпан или потребитель не ушёл.
+        """
+        await self._acquire()
+        self._in_flight += 1
+
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def pump() -> None:
+            try:
+                for item in func(*args, **kwargs):
+                    if stop.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, (item, None))
+            except BaseException as exc:  # noqa: BLE001 - пробрасываем в event loop
+                loop.call_soon_threadsafe(queue.put_nowait, (_STREAM_END, exc))
+            else:
+                loop.call_soon_threadsafe(queue.put_nowait, (_STREAM_END, None))
+
+        loop.run_in_executor(self._executor, pump)
+        try:
+            while True:
+                item, error = await queue.get()
+                if item is _STREAM_END:
+                    if error is not None:
+                        raise error
+                    break
+                yield item
+        except Exception:
+            self._failed += 1
+            raise
+        else:
+            self._completed += 1
+        finally:
+            stop.set()
+            self._in_flight -= 1
+            self._semaphore.release()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "queue_depth": self._queued,
+            "in_flight": self._in_flight,
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+        }
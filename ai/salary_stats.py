@@ -0,0 +1,278 @@
+"""
+Статистика зарплат по профессиям и регионам на NumPy
+
+Два шага:
+    1. build_columns — вакансии из parsed_jobs раскладываются по колонкам
+       (salary_from, salary_to, валюта, регион, опыт, профессия) в .npy-файлы;
+       строковые поля хранятся кодами, словари — в vocab.json.
+    2. compute_salary_stats — колонки открываются через mmap и считаются
+       перцентили, медианы и гистограммы сразу для всех групп, без циклов
+       по вакансиям. Результат — salary_stats.json, который подмешивается
+       в промпт генерации карточек (см. text_ai/salary_table.py).
+
+Запуск:
+    python salary_stats.py --base-folder parsed_jobs
+"""
+
+import argparse
+import json
+import time
+from array import array
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from vacancy_store import find_profession_file, iter_vacancies
+
+DEFAULT_COLUMNS_DIR = Path("parsed_jobs") / "salary_columns"
+DEFAULT_STATS_PATH = Path("parsed_jobs") / "salary_stats.json"
+PERCENTILES = (10, 25, 50, 75, 90)
+# Границы гистограммы в рублях: шаг 25 000 до 500 000, всё выше — в последнем столбце
+HISTOGRAM_EDGES = tuple(range(0, 500_001, 25_000))
+# Группы меньше этого размера в таблицу не попадают: перцентили по паре вакансий бессмысленны
+MIN_GROUP_SIZE = 5
+
+
+class _Vocabulary:
+    """
+    Кодирует строки целыми числами в порядке появления
+    """
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+
+    def code(self, value: Optional[str]) -> int:
+        value = value or ""
+        if value not in self.codes:
+            self.codes[value] = len(self.codes)
+        return self.codes[value]
+
+    def values(self) -> List[str]:
+        return list(self.codes)
+
+
+def build_columns(base_folder: str = "parsed_jobs", columns_dir: Path = DEFAULT_COLUMNS_DIR) -> int:
+    """
+    Раскладывает вакансии всех профессий по колонкам .npy
+
+    Вакансия, найденная по нескольким профессиям, попадает в каждую из них
+    (внутри профессии повторы по ID пропускаются).
+
+    Args:
+        base_folder: Папка с результатами краулера (по подпапке на профессию)
+        columns_dir: Куда сохранить колонки и словари
+
+    Returns:
+        Количество строк в колонках
+    """
+    salary_from, salary_to = array("d"), array("d")
+    currency, area, experience, profession = array("i"), array("i"), array("i"), array("i")
+    vocabularies = {name: _Vocabulary() for name in ("currency", "area", "experience", "profession")}
+
+    for folder in sorted(path for path in Path(base_folder).iterdir() if path.is_dir()):
+        data_file = find_profession_file(folder)
+        if data_file is None:
+            continue
+        profession_code = vocabularies["profession"].code(folder.name)
+        seen = set()
+        rows_before = len(salary_from)
+
+        for vacancy in iter_vacancies(data_file):
+            salary = vacancy.get("salary_raw")
+            vacancy_id = vacancy.get("id")
+            if not salary or vacancy_id in seen:
+                continue
+            seen.add(vacancy_id)
+            salary_from.append(float(salary.get("from") or "nan"))
+            salary_to.append(float(salary.get("to") or "nan"))
+            currency.append(vocabularies["currency"].code(salary.get("currency")))
+            area.append(vocabularies["area"].code(vacancy.get("area")))
+            experience.append(vocabularies["experience"].code(vacancy.get("experience")))
+            profession.append(profession_code)
+
+        print(f"{folder.name}: {len(salary_from) - rows_before} вакансий с зарплатой")
+
+    columns_dir.mkdir(parents=True, exist_ok=True)
+    np.save(columns_dir / "salary_from.npy", np.frombuffer(salary_from, dtype=np.float64))
+    np.save(columns_dir / "salary_to.npy", np.frombuffer(salary_to, dtype=np.float64))
+    for name, column in (("currency", currency), ("area", area), ("experience", experience), ("profession", profession)):
+        np.save(columns_dir / f"{name}.npy", np.frombuffer(column, dtype=np.int32))
+    with open(columns_dir / "vocab.json", "w", encoding="utf-8") as file:
+        json.dump({name: vocabulary.values() for name, vocabulary in vocabularies.items()}, file, ensure_ascii=False)
+
+    return len(salary_from)
+
+
+def load_columns(columns_dir: Path = DEFAULT_COLUMNS_DIR) -> Tuple[Dict[str, np.ndarray], Dict[str, List[str]]]:
+    """
+    Открывает колонки через mmap: данные читаются с диска по мере обращения
+    """
+    names = ("salary_from", "salary_to", "currency", "area", "experience", "profession")
+    columns = {name: np.load(columns_dir / f"{name}.npy", mmap_mode="r") for name in names}
+    with open(columns_dir / "vocab.json", "r", encoding="utf-8") as file:
+        vocab = json.load(file)
+    return columns, vocab
+
+
+def salary_points(salary_from: np.ndarray, salary_to: np.ndarray) -> np.ndarray:
+    """
+    Одна оценка зарплаты на вакансию: середина вилки или известная граница
+    """
+    return np.where(
+        np.isnan(salary_from),
+        salary_to,
+        np.where(np.isnan(salary_to), salary_from, (salary_from + salary_to) / 2),
+    )
+
+
+def grouped_stats(
+    codes: np.ndarray,
+    values: np.ndarray,
+    percentiles: Sequence[float] = PERCENTILES,
+    edges: Sequence[float] = HISTOGRAM_EDGES,
+) -> Dict[str, np.ndarray]:
+    """
+    Перцентили, средние и гистограммы для всех групп за один проход
+
+    Значения сортируются внутри групп одним lexsort, после чего перцентиль
+    каждой группы — это линейная интерполяция между двумя элементами
+    отсортированного массива (как np.percentile), посчитанная сразу для
+    всех групп.
+
+    Args:
+        codes: Код группы для каждого значения
+        values: Значения (без NaN)
+        percentiles: Какие перцентили считать
+        edges: Границы гистограммы; значения вне диапазона попадают в крайние столбцы
+
+    Returns:
+        Словарь массивов по группам: groups, count, mean, percentiles (группы × перцентили),
+        histogram (группы × столбцы)
+    """
+    order = np.lexsort((values, codes))
+    sorted_codes, sorted_values = codes[order], values[order]
+    groups, starts, counts = np.unique(sorted_codes, return_index=True, return_counts=True)
+
+    positions = (counts[:, None] - 1) * (np.asarray(percentiles, dtype=np.float64)[None, :] / 100)
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.minimum(lower + 1, counts[:, None] - 1)
+    low_values = sorted_values[starts[:, None] + lower]
+    high_values = sorted_values[starts[:, None] + upper]
+    group_percentiles = low_values + (high_values - low_values) * (positions - lower)
+
+    group_index = np.repeat(np.arange(len(groups)), counts)
+    sums = np.bincount(group_index, weights=sorted_values, minlength=len(groups))
+
+    bins = len(edges) - 1
+    bin_index = np.clip(np.searchsorted(np.asarray(edges), sorted_values, side="right") - 1, 0, bins - 1)
+    histogram = np.bincount(group_index * bins + bin_index, minlength=len(groups) * bins).reshape(len(groups), bins)
+
+    return {
+        "groups": groups,
+        "count": counts,
+        "mean": sums / counts,
+        "percentiles": group_percentiles,
+        "histogram": histogram,
+    }
+
+
+def _group_rows(stats: Dict[str, np.ndarray], index: int) -> Dict[str, Any]:
+    row = {"count": int(stats["count"][index]), "mean": round(float(stats["mean"][index]))}
+    for percentile, value in zip(PERCENTILES, stats["percentiles"][index]):
+        row["median" if percentile == 50 else f"p{percentile}"] = round(float(value))
+    row["histogram"] = stats["histogram"][index].tolist()
+    return row
+
+
+def compute_salary_stats(
+    columns: Dict[str, np.ndarray],
+    vocab: Dict[str, List[str]],
+    currency: str = "RUR",
+    min_group_size: int = MIN_GROUP_SIZE,
+) -> Dict[str, Any]:
+    """
+    Таблица зарплат: по профессии, профессии × региону и профессии × опыту
+
+    Args:
+        columns: Колонки из load_columns
+        vocab: Словари кодов из load_columns
+        currency: Валюта, по которой считаются зарплаты (остальные отбрасываются)
+        min_group_size: Минимальное число вакансий в группе
+
+    Returns:
+        Словарь, готовый к сохранению в JSON
+    """
+    points = salary_points(np.asarray(columns["salary_from"]), np.asarray(columns["salary_to"]))
+    mask = ~np.isnan(points)
+    if currency in vocab["currency"]:
+        mask &= np.asarray(columns["currency"]) == vocab["currency"].index(currency)
+    else:
+        mask[:] = False
+
+    values = points[mask]
+    profession = np.asarray(columns["profession"])[mask].astype(np.int64)
+    area = np.asarray(columns["area"])[mask].astype(np.int64)
+    experience = np.asarray(columns["experience"])[mask].astype(np.int64)
+
+    by_profession = grouped_stats(profession, values)
+    # Составной код группы: профессия * размер словаря + значение
+    by_area = grouped_stats(profession * len(vocab["area"]) + area, values)
+    by_experience = grouped_stats(profession * len(vocab["experience"]) + experience, values)
+
+    professions: Dict[str, Any] = {}
+    for index, code in enumerate(by_profession["groups"]):
+        if by_profession["count"][index] >= min_group_size:
+            professions[vocab["profession"][code]] = {**_group_rows(by_profession, index), "areas": {}, "experience": {}}
+
+    for key, stats, names in (("areas", by_area, vocab["area"]), ("experience", by_experience, vocab["experience"])):
+        for index, code in enumerate(stats["groups"]):
+            profession_name = vocab["profession"][code // len(names)]
+            if stats["count"][index] < min_group_size or profession_name not in professions:
+                continue
+            professions[profession_name][key][names[code % len(names)] or "не указано"] = _group_rows(stats, index)
+
+    for row in professions.values():
+        # Крупные регионы первыми — в промпт попадают первые из них
+        row["areas"] = dict(sorted(row["areas"].items(), key=lambda item: -item[1]["count"]))
+
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "currency": currency,
+        "vacancies_with_salary": int(mask.sum()),
+        "histogram_edges": list(HISTOGRAM_EDGES),
+        "professions": professions,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Статистика зарплат по вакансиям HeadHunter")
+    parser.add_argument("--base-folder", default="parsed_jobs")
+    parser.add_argument("--columns-dir", type=Path, default=DEFAULT_COLUMNS_DIR)
+    parser.add_argument("--output", type=Path, default=DEFAULT_STATS_PATH)
+    parser.add_argument("--currency", default="RUR")
+    parser.add_argument("--skip-build", action="store_true", help="Считать по уже собранным колонкам")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if not args.skip_build:
+        rows = build_columns(args.base_folder, args.columns_dir)
+        print(f"Колонки: {rows} строк за {time.perf_counter() - started:.1f} с")
+
+    stats_started = time.perf_counter()
+    columns, vocab = load_columns(args.columns_dir)
+    stats = compute_salary_stats(columns, vocab, currency=args.currency)
+    tmp_path = args.output.with_name(f".tmp-{args.output.name}")
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(stats, file, ensure_ascii=False, indent=2)
+    tmp_path.replace(args.output)
+
+    print(
+        f"Статистика: {len(stats['professions'])} профессий, {stats['vacancies_with_salary']} зарплат "
+        f"за {time.perf_counter() - stats_started:.2f} с -> {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
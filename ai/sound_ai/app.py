@@ -5,21 +5,31 @@ import os
 import numpy as np
 import soundfile as sf
 import tempfile
+import threading
 import zipfile
-from typing import List
+from pathlib import Path
+from typing import Any, Dict, List
+
+from audio_cache import AudioCache, audio_cache_key
+from model_registry import ModelRegistry
+from scheduler import BatchScheduler, SchedulerBusy
+from seeding import per_item_seeds
+from streaming import StreamStats, StreamTiming, encode_mp3, stream_continuation
 
 
 DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
 # По умолчанию: музыка (MusicGen small); для эффектов используем AudioGen medium
 MUSIC_MODEL_ID = "facebook/musicgen-small"
 SFX_MODEL_ID = "facebook/audiogen-medium"
+MODEL_IDS = {"small": MUSIC_MODEL_ID, "medium": "facebook/musicgen-medium", "sfx": SFX_MODEL_ID}
+GENERATION_PARAMS = {"top_k": 250, "top_p": 0.0, "temperature": 1.0, "cfg_coef": 3.0}
 
 
 def load_music_model(model_id: str = MUSIC_MODEL_ID):
     model = MusicGen.get_pretrained(model_id)
     if DEVICE == "cuda":
         model = model.to(DEVICE)
-    model.set_generation_params(duration=8, top_k=250, top_p=0.0, temperature=1.0, cfg_coef=3.0)
+    model.set_generation_params(duration=8, **GENERATION_PARAMS)
     return model
 
 
@@ -27,12 +37,21 @@ def load_sfx_model(model_id: str = SFX_MODEL_ID):
     model = AudioGen.get_pretrained(model_id)
     if DEVICE == "cuda":
         model = model.to(DEVICE)
-    model.set_generation_params(duration=8, top_k=250, top_p=0.0, temperature=1.0, cfg_coef=3.0)
+    model.set_generation_params(duration=8, **GENERATION_PARAMS)
     return model
 
 
-music_model = load_music_model()
-_sfx_model = None  # лениво загрузим при первом вызове
+# Каждая модель грузится один раз; при нехватке бюджета памяти выгружается давно не используемая
+_MODELS = ModelRegistry(
+    {
+        "small": lambda: load_music_model(MODEL_IDS["small"]),
+        "medium": lambda: load_music_model(MODEL_IDS["medium"]),
+        "sfx": lambda: load_sfx_model(MODEL_IDS["sfx"]),
+    },
+    memory_budget_bytes=int(float(os.environ.get("SOUND_MODEL_MEMORY_BUDGET_MB", 0)) * 2**20) or None,
+)
+# Что загрузить при старте (через запятую); по умолчанию — музыкальная small, как и раньше
+PRELOAD_MODELS = [name.strip() for name in os.environ.get("SOUND_PRELOAD_MODELS", "small").split(",") if name.strip()]
 
 
 def _tensor_to_wav_path(audio_tensor: torch.Tensor, sample_rate: int) -> str:
@@ -54,21 +73,64 @@ def _tensor_to_wav_path(audio_tensor: torch.Tensor, sample_rate: int) -> str:
     return path
 
 
+# Параметры генерации хранятся в самой модели, поэтому батчи и потоковые сегменты не идут одновременно
+_GENERATION_LOCK = threading.Lock()
+
+
+def _run_batch(model_name: str, duration: float, descriptions: List[str], seeds: List[int]):
+    model = _MODELS.get(model_name)
+    with _GENERATION_LOCK, torch.no_grad(), per_item_seeds(seeds):
+        model.set_generation_params(duration=duration)
+        wavs = model.generate(descriptions=descriptions, progress=False)
+    return list(wavs), model.sample_rate
+
+
+# Одновременные запросы с одной моделью и длительностью идут одним батчем
+SOUND_MAX_BATCH_SIZE = int(os.environ.get("SOUND_MAX_BATCH_SIZE", 4))
+_SCHEDULER = BatchScheduler(
+    _run_batch,
+    max_batch_size=SOUND_MAX_BATCH_SIZE,
+    max_wait=float(os.environ.get("SOUND_MAX_WAIT_MS", 50)) / 1000,
+    max_queue=int(os.environ.get("SOUND_QUEUE_DEPTH", 32)),
+)
+
+
+# Готовые WAV/ZIP по ключу входов генерации; SOUND_CACHE_MAX_MB=0 отключает кэш
+SOUND_CACHE_MAX_MB = float(os.environ.get("SOUND_CACHE_MAX_MB", 2048))
+_AUDIO_CACHE = (
+    AudioCache(Path(os.environ.get("SOUND_CACHE_DIR", "audio_cache")), int(SOUND_CACHE_MAX_MB * 2**20))
+    if SOUND_CACHE_MAX_MB > 0
+    else None
+)
+
+
 def generate_audio(prompt: str, duration: float, seed: int, model_size: str, task: str, layers: int):
     # task: "music" | "sfx"
-    torch.manual_seed(int(seed))
-
-    if task == "sfx":
-        global _sfx_model
-        if _sfx_model is None:
-            _sfx_model = load_sfx_model()
-        _sfx_model.set_generation_params(duration=float(duration))
-        paths: List[str] = []
-        for i in range(max(1, int(layers))):
-            torch.manual_seed(int(seed) + i)
-            with torch.no_grad():
-                wav = _sfx_model.generate(descriptions=[prompt], progress=False)
-            paths.append(_tensor_to_wav_path(wav[0], _sfx_model.sample_rate))
+    model_name = "sfx" if task == "sfx" else ("medium" if model_size == "medium" else "small")
+    if _AUDIO_CACHE is None:
+        return _generate_audio(prompt, duration, seed, model_name, layers)
+
+    key = audio_cache_key(
+        model=MODEL_IDS[model_name],
+        params=GENERATION_PARAMS,
+        prompt=prompt,
+        duration=float(duration),
+        seed=int(seed),
+        layers=max(1, int(layers)) if model_name == "sfx" else 1,
+    )
+    suffix = ".zip" if model_name == "sfx" else ".wav"
+    cached = _AUDIO_CACHE.get(key, suffix)
+    if cached is not None:
+        return str(cached)
+    return str(_AUDIO_CACHE.put(key, _generate_audio(prompt, duration, seed, model_name, layers), suffix))
+
+
+def _generate_audio(prompt: str, duration: float, seed: int, model_name: str, layers: int) -> str:
+    if model_name == "sfx":
+        # Все слои — один батч; у слоя i свой сид seed + i, как при поштучной генерации
+        layer_seeds = [int(seed) + i for i in range(max(1, int(layers)))]
+        wavs, sample_rate = _submit("sfx", duration, [prompt] * len(layer_seeds), layer_seeds)
+        paths: List[str] = [_tensor_to_wav_path(wav, sample_rate) for wav in wavs]
         # упаковка в ZIP
         zfd, zpath = tempfile.mkstemp(suffix=".zip")
         os.close(zfd)
@@ -78,16 +140,49 @@ def generate_audio(prompt: str, duration: float, seed: int, model_size: str, tas
         return zpath
 
     # music
-    target_model = music_model
-    if model_size == "medium":
-        target_model = load_music_model("facebook/musicgen-medium")
-    elif model_size == "small":
-        target_model = load_music_model("facebook/musicgen-small")
-
-    target_model.set_generation_params(duration=float(duration))
-    with torch.no_grad():
-        wav = target_model.generate(descriptions=[prompt], progress=False)
-    return _tensor_to_wav_path(wav[0], target_model.sample_rate)
+    wavs, sample_rate = _submit(model_name, duration, [prompt], [int(seed)])
+    return _tensor_to_wav_path(wavs[0], sample_rate)
+
+
+def _submit(model_name: str, duration: float, descriptions: List[str], seeds: List[int]):
+    try:
+        return _SCHEDULER.submit(model_name, float(duration), descriptions, seeds)
+    except SchedulerBusy as exc:
+        raise gr.Error("Сервис перегружен, попробуйте чуть позже") from exc
+
+
+# Потоковый режим: трек генерируется сегментами, каждый сегмент продолжает хвост предыдущих
+SOUND_STREAM_SEGMENT_SECONDS = float(os.environ.get("SOUND_STREAM_SEGMENT_SECONDS", 5))
+SOUND_STREAM_CONTEXT_SECONDS = float(os.environ.get("SOUND_STREAM_CONTEXT_SECONDS", 5))
+_STREAM_STATS = StreamStats()
+
+
+def stream_music(prompt: str, duration: float, seed: int, model_size: str):
+    model = _MODELS.get("medium" if model_size == "medium" else "small")
+    timing = StreamTiming()
+    try:
+        for chunk in stream_continuation(
+            model,
+            prompt,
+            float(duration),
+            int(seed),
+            segment_seconds=SOUND_STREAM_SEGMENT_SECONDS,
+            context_seconds=SOUND_STREAM_CONTEXT_SECONDS,
+            lock=_GENERATION_LOCK,
+            timing=timing,
+        ):
+            yield encode_mp3(chunk, model.sample_rate)
+    finally:
+        _STREAM_STATS.record(timing)
+
+
+def service_stats() -> Dict[str, Any]:
+    return {
+        "models": _MODELS.stats(),
+        "scheduler": _SCHEDULER.stats(),
+        "audio_cache": _AUDIO_CACHE.stats() if _AUDIO_CACHE is not None else None,
+        "streaming": _STREAM_STATS.stats(),
+    }
 
 
 iface = gr.Interface(
@@ -108,8 +203,34 @@ iface = gr.Interface(
     ),
 )
 
+stream_iface = gr.Interface(
+    fn=stream_music,
+    inputs=[
+        gr.Textbox(label="Промпт", value="Create a realistic ambient soundscape of an office."),
+        gr.Slider(2, 60, value=20, step=1, label="Длительность (сек)"),
+        gr.Number(value=0, precision=0, label="Seed"),
+        gr.Dropdown(choices=["small", "medium"], value="small", label="Размер модели (Music)"),
+    ],
+    outputs=gr.Audio(label="Музыка (MP3, играет по мере генерации)", streaming=True, autoplay=True),
+    title="MusicGen: потоковая генерация",
+    description="Трек генерируется сегментами и начинает играть после первого из них.",
+    allow_flagging="never",
+)
+
+stats_iface = gr.Interface(
+    fn=service_stats,
+    inputs=[],
+    outputs=gr.JSON(label="Модели и очередь генерации"),
+    title="Статистика сервиса",
+    allow_flagging="never",
+)
+demo = gr.TabbedInterface([iface, stream_iface, stats_iface], ["Генерация", "Потоковая музыка", "Статистика"])
+
 
 if __name__ == "__main__":
-    iface.launch(server_name="0.0.0.0", server_port=int(os.environ.get("PORT", 7860)), share=True, show_api=False)
+    _MODELS.preload(PRELOAD_MODELS)
+    # Обработчиков больше, чем мест в батче: пока один батч считается, набирается следующий
+    demo.queue(concurrency_count=2 * SOUND_MAX_BATCH_SIZE, max_size=_SCHEDULER.max_queue)
+    demo.launch(server_name="0.0.0.0", server_port=int(os.environ.get("PORT", 7860)), share=True, show_api=False)
 
 
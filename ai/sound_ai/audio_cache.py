@@ -0,0 +1,107 @@
+"""Кэш сгенерированного аудио на диске.
+
+Генерация детерминирована: одинаковые промпт, сид, длительность, модель и
+параметры дают одинаковый звук. Поэтому готовый WAV/ZIP хранится под
+sha256 этих входов и отдаётся повторно без генерации. Время последнего
+обращения — mtime файла; при превышении лимита размера удаляются файлы,
+к которым дольше всего не обращались.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Меняется, если меняется способ генерации (сэмплирование, формат файлов)
+CACHE_VERSION = 1
+
+
+def audio_cache_key(**inputs: Any) -> str:
+    payload = json.dumps({"version": CACHE_VERSION, **inputs}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """Файлы <dir>/<первые 2 символа ключа>/<ключ><расширение> с LRU-вытеснением по размеру."""
+
+    def __init__(self, directory: Path, max_bytes: int) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        directory.mkdir(parents=True, exist_ok=True)
+        self._total_bytes = sum(path.stat().st_size for path in self._files())
+
+    def _files(self):
+        return (path for path in self.directory.glob("*/*") if path.is_file() and not path.name.startswith(".tmp-"))
+
+    def _path(self, key: str, suffix: str) -> Path:
+        return self.directory / key[:2] / f"{key}{suffix}"
+
+    def get(self, key: str, suffix: str) -> Optional[Path]:
+        path = self._path(key, suffix)
+        with self._lock:
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                self._misses += 1
+                return None
+            self._hits += 1
+        return path
+
+    def put(self, key: str, source: str, suffix: str) -> Path:
+        """Переносит готовый файл в кэш и возвращает его новый путь."""
+
+        path = self._path(key, suffix)
+        path.parent.mkdir(exist_ok=True)
+        tmp_path = path.with_name(f".tmp-{path.name}")
+        shutil.move(source, tmp_path)
+        size = tmp_path.stat().st_size
+        with self._lock:
+            if path.exists():
+                self._total_bytes -= path.stat().st_size
+            os.replace(tmp_path, path)
+            self._total_bytes += size
+            if self._total_bytes > self.max_bytes:
+                self._evict(keep=path)
+        return path
+
+    def _evict(self, keep: Path) -> None:
+        # Вызывается под self._lock
+        started = time.perf_counter()
+        candidates = sorted(
+            ((path.stat().st_mtime, path) for path in self._files() if path != keep), key=lambda item: item[0]
+        )
+        for _, path in candidates:
+            if self._total_bytes <= self.max_bytes:
+                break
+            try:
+                size = path.stat().st_size
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            self._total_bytes -= size
+            self._evictions += 1
+        logger.info("Audio cache eviction took %.3fs, %s bytes left", time.perf_counter() - started, self._total_bytes)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "directory": str(self.directory),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "evictions": self._evictions,
+            }
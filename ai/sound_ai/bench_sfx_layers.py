@@ -0,0 +1,58 @@
+"""Сравнение времени генерации SFX-слоёв на CPU: по одному слою против одного батча.
+
+Запуск:
+    python bench_sfx_layers.py --duration 2 --max-layers 6
+"""
+
+import argparse
+import time
+
+import torch
+from audiocraft.models import AudioGen
+
+from seeding import per_item_seeds
+
+
+def sequential(model, prompt: str, seed: int, layers: int) -> None:
+    for i in range(layers):
+        torch.manual_seed(seed + i)
+        model.generate(descriptions=[prompt], progress=False)
+
+
+def batched(model, prompt: str, seed: int, layers: int) -> None:
+    with per_item_seeds([seed + i for i in range(layers)]):
+        model.generate(descriptions=[prompt] * layers, progress=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк пакетной генерации SFX-слоёв")
+    parser.add_argument("--model", default="facebook/audiogen-medium")
+    parser.add_argument("--prompt", default="Create a realistic ambient soundscape of an office.")
+    parser.add_argument("--duration", type=float, default=2.0, help="Длительность слоя, секунды")
+    parser.add_argument("--max-layers", type=int, default=6)
+    parser.add_argument("--threads", type=int, default=0, help="torch.set_num_threads (0 — по умолчанию)")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    model = AudioGen.get_pretrained(args.model, device="cpu")
+    model.set_generation_params(duration=args.duration, top_k=250, top_p=0.0, temperature=1.0, cfg_coef=3.0)
+
+    with torch.no_grad():
+        # Прогрев: первый проход заметно медленнее из-за выделения памяти
+        batched(model, args.prompt, 0, 1)
+        print(f"{'слоёв':>6} {'по одному, с':>14} {'батчем, с':>10} {'ускорение':>10}")
+        for layers in range(1, args.max_layers + 1):
+            started = time.perf_counter()
+            sequential(model, args.prompt, 0, layers)
+            sequential_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            batched(model, args.prompt, 0, layers)
+            batched_seconds = time.perf_counter() - started
+
+            print(f"{layers:>6} {sequential_seconds:>14.2f} {batched_seconds:>10.2f} {sequential_seconds / batched_seconds:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Реестр моделей AudioCraft: каждая модель грузится один раз и остаётся в памяти.
+
+Если суммарный размер моделей превышает бюджет, выгружается та, что дольше
+всех не использовалась (LRU).
+"""
+
+import gc
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+
+def _rss_bytes() -> int:
+    """Текущий RSS процесса (Linux); 0, если узнать нельзя."""
+    try:
+        with open("/proc/self/statm", "r") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def model_memory_bytes(model: Any) -> int:
+    """Размер весов и буферов модели AudioCraft (языковая модель + компрессор)."""
+    modules = [module for module in (getattr(model, "lm", None), getattr(model, "compression_model", None)) if module is not None]
+    return sum(
+        tensor.numel() * tensor.element_size()
+        for module in modules
+        for tensor in chain(module.parameters(), module.buffers())
+    )
+
+
+@dataclass
+class ModelInfo:
+    name: str
+    load_seconds: float
+    memory_bytes: int
+    rss_delta_bytes: int
+    loaded_at: float = field(default_factory=time.time)
+    last_used: float = field(default_factory=time.time)
+    hits: int = 0
+
+
+class ModelRegistry:
+    """Загруженные модели по имени ("small", "medium", "sfx", ...).
+
+    loaders — функции без аргументов, которые загружают модель.
+    memory_budget_bytes — предел суммарного размера моделей (None — без предела);
+    только что загруженная модель не выгружается, даже если одна не влезает.
+    """
+
+    def __init__(self, loaders: Dict[str, Callable[[], Any]], memory_budget_bytes: Optional[int] = None) -> None:
+        self._loaders = loaders
+        self._budget = memory_budget_bytes
+        self._models: "OrderedDict[str, Any]" = OrderedDict()
+        self._info: Dict[str, ModelInfo] = {}
+        self._lock = threading.Lock()
+        # Отдельная блокировка на модель: параллельные запросы не грузят её дважды
+        self._load_locks = {name: threading.Lock() for name in loaders}
+        self._loads = 0
+        self._evictions = 0
+
+    def get(self, name: str) -> Any:
+        if name not in self._loaders:
+            raise KeyError(f"Unknown model: {name}")
+        with self._lock:
+            model = self._touch(name)
+        if model is not None:
+            return model
+
+        with self._load_locks[name]:
+            with self._lock:
+                model = self._touch(name)
+            if model is not None:
+                return model
+            model = self._load(name)
+
+        with self._lock:
+            self._models[name] = model
+            self._evict(keep=name)
+        return model
+
+    def _touch(self, name: str) -> Optional[Any]:
+        model = self._models.get(name)
+        if model is not None:
+            self._models.move_to_end(name)
+            info = self._info[name]
+            info.hits += 1
+            info.last_used = time.time()
+        return model
+
+    def _load(self, name: str) -> Any:
+        rss_before = _rss_bytes()
+        started = time.perf_counter()
+        model = self._loaders[name]()
+        info = ModelInfo(
+            name=name,
+            load_seconds=round(time.perf_counter() - started, 2),
+            memory_bytes=model_memory_bytes(model),
+            rss_delta_bytes=max(0, _rss_bytes() - rss_before),
+        )
+        logger.info(
+            "Loaded sound model %s in %.1fs (%.0f MB weights)", name, info.load_seconds, info.memory_bytes / 2**20
+        )
+        with self._lock:
+            self._info[name] = info
+            self._loads += 1
+        return model
+
+    def _evict(self, keep: str) -> None:
+        if self._budget is None:
+            return
+        evicted = False
+        while self._resident_bytes() > self._budget:
+            victim = next((name for name in self._models if name != keep), None)
+            if victim is None:
+                break
+            del self._models[victim]
+            self._info.pop(victim, None)
+            self._evictions += 1
+            evicted = True
+            logger.info("Evicted sound model %s to stay within memory budget", victim)
+        if evicted:
+            gc.collect()
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+
+    def _resident_bytes(self) -> int:
+        return sum(self._info[name].memory_bytes for name in self._models)
+
+    def preload(self, names: Iterable[str]) -> None:
+        for name in names:
+            self.get(name)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "loaded": list(self._models),
+                "resident_bytes": self._resident_bytes(),
+                "budget_bytes": self._budget,
+                "process_rss_bytes": _rss_bytes(),
+                "loads": self._loads,
+                "evictions": self._evictions,
+                "models": {name: asdict(self._info[name]) for name in self._models},
+            }
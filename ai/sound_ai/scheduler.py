@@ -0,0 +1,157 @@
+"""Микробатчинг запросов генерации звука.
+
+Запросы Gradio приходят из разных потоков и ждут результата. Один рабочий
+поток собирает запросы с одинаковой моделью и длительностью, пока батч не
+наполнится или не истечёт max_wait от прихода самого старого запроса, и
+прогоняет их одним вызовом generate. Сиды у каждого элемента свои (см.
+seeding.py), поэтому результат не зависит от соседей по батчу.
+"""
+
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# run_batch(model_name, duration, descriptions, seeds) -> (аудио по элементам, sample_rate)
+RunBatch = Callable[[str, float, List[str], List[int]], Tuple[List[Any], int]]
+
+
+class SchedulerBusy(RuntimeError):
+    """Очередь заполнена — запрос отклонён."""
+
+
+@dataclass
+class _Request:
+    key: Tuple[str, float]
+    descriptions: List[str]
+    seeds: List[int]
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class BatchScheduler:
+    """Очередь запросов перед моделью и рабочий поток, который гоняет батчи.
+
+    max_batch_size — сколько элементов (треков или SFX-слоёв) в одном вызове generate;
+    запрос, который один больше этого числа, выполняется отдельным батчем.
+    max_wait — сколько секунд самый старый запрос может ждать попутчиков.
+    max_queue — сколько запросов может ждать; сверх этого submit бросает SchedulerBusy.
+    """
+
+    def __init__(self, run_batch: RunBatch, max_batch_size: int = 4, max_wait: float = 0.05, max_queue: int = 32) -> None:
+        self._run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait)
+        self.max_queue = max(1, max_queue)
+        self._pending: List[_Request] = []
+        self._cond = threading.Condition()
+        self._batch_sizes: Counter = Counter()
+        self._items = 0
+        self._requests = 0
+        self._rejected = 0
+        self._failed_batches = 0
+        self._max_depth = 0
+        self._wait_seconds = 0.0
+        self._run_seconds = 0.0
+        self._worker = threading.Thread(target=self._loop, name="sound-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, model_name: str, duration: float, descriptions: Sequence[str], seeds: Sequence[int]) -> Tuple[List[Any], int]:
+        """Ставит запрос в очередь и ждёт его результат: (аудио по элементам, sample_rate)."""
+
+        request = _Request((model_name, float(duration)), list(descriptions), [int(seed) for seed in seeds])
+        with self._cond:
+            if len(self._pending) >= self.max_queue:
+                self._rejected += 1
+                raise SchedulerBusy(f"Sound generation queue is full ({self.max_queue} requests)")
+            self._pending.append(request)
+            self._max_depth = max(self._max_depth, len(self._pending))
+            self._cond.notify_all()
+        return request.future.result()
+
+    def _take_batch(self) -> List[_Request]:
+        # Вызывается под self._cond, когда очередь не пуста
+        first = self._pending[0]
+        deadline = first.enqueued_at + self.max_wait
+        while True:
+            batch, size = [], 0
+            for request in self._pending:
+                if request.key != first.key:
+                    continue
+                if batch and size + len(request.seeds) > self.max_batch_size:
+                    break
+                batch.append(request)
+                size += len(request.seeds)
+            remaining = deadline - time.monotonic()
+            if size >= self.max_batch_size or remaining <= 0:
+                break
+            self._cond.wait(remaining)
+
+        for request in batch:
+            self._pending.remove(request)
+        return batch
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                batch = self._take_batch()
+            if not self._execute(batch) and len(batch) > 1:
+                # Один плохой запрос не должен ронять соседей: повторяем каждый отдельно
+                for request in batch:
+                    self._execute([request])
+
+    def _execute(self, batch: List[_Request]) -> bool:
+        model_name, duration = batch[0].key
+        descriptions = [description for request in batch for description in request.descriptions]
+        seeds = [seed for request in batch for seed in request.seeds]
+        started = time.monotonic()
+        try:
+            audio, sample_rate = self._run_batch(model_name, duration, descriptions, seeds)
+        except Exception as exc:
+            logger.exception("Sound batch of %s items failed", len(seeds))
+            with self._cond:
+                self._failed_batches += 1
+            if len(batch) == 1:
+                batch[0].future.set_exception(exc)
+            return False
+        finished = time.monotonic()
+
+        offset = 0
+        for request in batch:
+            request.future.set_result((audio[offset : offset + len(request.seeds)], sample_rate))
+            offset += len(request.seeds)
+
+        with self._cond:
+            self._batch_sizes[len(seeds)] += 1
+            self._items += len(seeds)
+            self._requests += len(batch)
+            self._wait_seconds += sum(started - request.enqueued_at for request in batch)
+            self._run_seconds += finished - started
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            batches = sum(self._batch_sizes.values())
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": round(self.max_wait * 1000),
+                "max_queue": self.max_queue,
+                "queue_depth": len(self._pending),
+                "max_queue_depth": self._max_depth,
+                "rejected": self._rejected,
+                "failed_batches": self._failed_batches,
+                "batches": batches,
+                "requests": self._requests,
+                "items": self._items,
+                "avg_batch_size": round(self._items / batches, 2) if batches else 0.0,
+                "batch_sizes": dict(sorted(self._batch_sizes.items())),
+                "avg_batch_seconds": round(self._run_seconds / batches, 3) if batches else 0.0,
+                "avg_wait_ms": round(self._wait_seconds / self._requests * 1000, 1) if self._requests else 0.0,
+            }
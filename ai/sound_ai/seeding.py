@@ -0,0 +1,52 @@
+"""Свой сид у каждого элемента батча при генерации AudioCraft.
+
+AudioCraft сэмплирует токены всего батча из одного глобального RNG, поэтому
+результат элемента зависит от соседей по батчу. Внутри per_item_seeds
+сэмплирование идёт отдельным torch.Generator на каждую строку батча: элемент
+с сидом s звучит одинаково и в одиночку, и в батче любого размера.
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Sequence
+
+import torch
+from audiocraft.utils import utils as audiocraft_utils
+
+# Подмена модульная, поэтому одновременно действует только один набор сидов
+_PATCH_LOCK = threading.Lock()
+
+
+@contextmanager
+def per_item_seeds(seeds: Sequence[int]) -> Iterator[None]:
+    original = audiocraft_utils.multinomial
+    generators: Dict[int, torch.Generator] = {}
+
+    def generator_for(index: int, device: torch.device) -> torch.Generator:
+        if index not in generators:
+            generators[index] = torch.Generator(device=device).manual_seed(int(seeds[index]))
+        return generators[index]
+
+    def multinomial(
+        input: torch.Tensor, num_samples: int, replacement: bool = False, *, generator: Optional[torch.Generator] = None
+    ) -> torch.Tensor:
+        if input.dim() < 2 or input.shape[0] != len(seeds):
+            return original(input, num_samples, replacement=replacement, generator=generator)
+        # Строки каждого элемента батча (все кодбуки) идут подряд
+        rows = input.reshape(len(seeds), -1, input.shape[-1])
+        samples = torch.stack(
+            [
+                torch.multinomial(
+                    rows[index], num_samples=num_samples, replacement=replacement, generator=generator_for(index, input.device)
+                )
+                for index in range(len(seeds))
+            ]
+        )
+        return samples.reshape(*list(input.shape[:-1]), -1)
+
+    with _PATCH_LOCK:
+        audiocraft_utils.multinomial = multinomial
+        try:
+            yield
+        finally:
+            audiocraft_utils.multinomial = original
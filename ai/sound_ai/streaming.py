@@ -0,0 +1,127 @@
+"""Потоковая генерация музыки сегментами через продолжение MusicGen.
+
+Первый сегмент генерируется как обычно, каждый следующий — через
+generate_continuation по хвосту уже сгенерированного звука. Сегменты
+кодируются в MP3 (кадры MP3 самодостаточны, поэтому куски можно проигрывать
+подряд по мере прихода), и слушатель получает первый звук через время
+генерации одного сегмента, а не всего трека.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional
+
+import av
+import numpy as np
+import torch
+
+from seeding import per_item_seeds
+
+
+@dataclass
+class StreamTiming:
+    first_audio_seconds: Optional[float] = None
+    total_seconds: float = 0.0
+    segments: int = 0
+
+
+class StreamStats:
+    """Сводка по потоковым генерациям: время до первого звука против полного времени."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._streams = 0
+        self._first_audio_seconds = 0.0
+        self._total_seconds = 0.0
+
+    def record(self, timing: StreamTiming) -> None:
+        if timing.first_audio_seconds is None:
+            return
+        with self._lock:
+            self._streams += 1
+            self._first_audio_seconds += timing.first_audio_seconds
+            self._total_seconds += timing.total_seconds
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            if not self._streams:
+                return {"streams": 0}
+            return {
+                "streams": self._streams,
+                "avg_first_audio_seconds": round(self._first_audio_seconds / self._streams, 2),
+                "avg_total_seconds": round(self._total_seconds / self._streams, 2),
+                "first_audio_share": round(self._first_audio_seconds / self._total_seconds, 3),
+            }
+
+
+def encode_mp3(audio: np.ndarray, sample_rate: int, bitrate: int = 128_000) -> str:
+    """Кодирует кусок (каналы × отсчёты, float в [-1, 1]) в MP3-файл и возвращает путь."""
+
+    audio = np.ascontiguousarray(np.clip(audio, -1.0, 1.0), dtype=np.float32)
+    layout = "mono" if audio.shape[0] == 1 else "stereo"
+    fd, path = tempfile.mkstemp(suffix=".mp3")
+    os.close(fd)
+    with av.open(path, "w", format="mp3") as container:
+        stream = container.add_stream("libmp3lame", rate=sample_rate)
+        stream.bit_rate = bitrate
+        stream.layout = layout
+        frame = av.AudioFrame.from_ndarray(audio, format="fltp", layout=layout)
+        frame.sample_rate = sample_rate
+        frame.pts = 0
+        for packet in stream.encode(frame):
+            container.mux(packet)
+        for packet in stream.encode(None):
+            container.mux(packet)
+    return path
+
+
+def stream_continuation(
+    model,
+    prompt: str,
+    duration: float,
+    seed: int,
+    segment_seconds: float,
+    context_seconds: float,
+    lock: threading.Lock,
+    timing: Optional[StreamTiming] = None,
+) -> Iterator[np.ndarray]:
+    """Отдаёт новые куски трека (каналы × отсчёты) по мере генерации.
+
+    Продолжение видит последние context_seconds уже готового звука, поэтому
+    сегменты стыкуются музыкально. Сегмент i сэмплируется с сидом seed + i.
+    lock — общая с остальной генерацией блокировка модели: параметры
+    генерации у модели одни на всех.
+    """
+
+    timing = timing or StreamTiming()
+    started = time.perf_counter()
+    sample_rate = model.sample_rate
+    tail: Optional[torch.Tensor] = None
+    generated = 0.0
+
+    while generated < duration - 1e-6:
+        step = min(segment_seconds, duration - generated)
+        with lock, torch.no_grad(), per_item_seeds([int(seed) + timing.segments]):
+            if tail is None:
+                model.set_generation_params(duration=step)
+                wav = model.generate(descriptions=[prompt], progress=False)
+                new_audio = wav[0]
+            else:
+                # Длительность продолжения считается вместе с контекстом
+                model.set_generation_params(duration=tail.shape[-1] / sample_rate + step)
+                wav = model.generate_continuation(tail[None], sample_rate, descriptions=[prompt], progress=False)
+                new_audio = wav[0, :, tail.shape[-1] :]
+
+        if new_audio.shape[-1] == 0:
+            break
+        context = int(context_seconds * sample_rate)
+        tail = (new_audio if tail is None else torch.cat([tail, new_audio], dim=-1))[:, -context:]
+        generated += new_audio.shape[-1] / sample_rate
+        timing.segments += 1
+        if timing.first_audio_seconds is None:
+            timing.first_audio_seconds = time.perf_counter() - started
+        timing.total_seconds = time.perf_counter() - started
+        yield new_audio.detach().cpu().float().numpy()
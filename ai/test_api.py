@@ -1,11 +1,166 @@
 from typing import List, Dict, Any, Optional
 
 import requests
+import asyncio
 import json
 import time
 import os
 
 
+# Регионы, по которым разбиваем запрос, если вакансий больше лимита API
+AREAS = [
+    (1, "Москва"),
+    (2, "Санкт-Петербург"),
+    (113, "Россия"),
+    (88, "Краснодар"),
+    (53, "Новосибирск"),
+    (66, "Екатеринбург"),
+    (54, "Казань"),
+    (26, "Ростов-на-Дону"),
+    (4, "Нижний Новгород"),
+    (76, "Челябинск"),
+    (3, "Воронеж"),
+    (99, "Самара"),
+    (95, "Уфа"),
+]
+
+PROFESSIONS = [
+    "Developer",
+    "Programmer",
+    "Software Engineer",
+    "Backend Developer",
+    "Frontend Developer",
+    "Full Stack Developer",
+    "Python Developer",
+    "Java Developer",
+    "JavaScript Developer",
+    "DevOps Engineer",
+    "QA Engineer",
+    "Test Engineer",
+    "System Administrator",
+    "Database Administrator",
+    "Architect",
+    "Solution Architect",
+    "Data Engineer",
+    "Machine Learning Engineer",
+    "Data Scientist",
+    "Data Analyst",
+    "Business Analyst",
+    "Product Manager",
+    "Project Manager",
+    "Scrum Master",
+    "UI Designer",
+    "UX Designer",
+    "Web Designer",
+    "Graphic Designer",
+    "Marketing Manager",
+    "Sales Manager",
+    "HR Manager",
+    "Recruiter",
+    "Accountant",
+    "Financial Analyst",
+    "Lawyer",
+    "Consultant",
+    "Engineer",
+    "Mechanical Engineer",
+    "Electrical Engineer",
+    "Civil Engineer",
+    "Doctor",
+    "Nurse",
+    "Surgeon",
+    "Therapist",
+    "Pediatrician",
+    "Dentist",
+    "Pharmacist",
+    "Veterinarian",
+    "Medical Assistant",
+    "Psychologist",
+    "Psychiatrist",
+    "Teacher",
+    "Tutor",
+    "Professor",
+    "Educator",
+    "Instructor",
+    "Trainer",
+    "Sales Representative",
+    "Sales Assistant",
+    "Cashier",
+    "Store Manager",
+    "Retail Assistant",
+    "Merchandiser",
+    "Sales Consultant",
+    "Shop Assistant",
+    "Builder",
+    "Construction Worker",
+    "Plumber",
+    "Electrician",
+    "Welder",
+    "Carpenter",
+    "Mason",
+    "Painter",
+    "Roofer",
+    "Driver",
+    "Truck Driver",
+    "Delivery Driver",
+    "Taxi Driver",
+    "Logistics Manager",
+    "Dispatcher",
+    "Warehouse Worker",
+    "Loader",
+    "Courier",
+    "Banker",
+    "Loan Officer",
+    "Cashier Bank",
+    "Financial Advisor",
+    "Auditor",
+    "Bookkeeper",
+    "Realtor",
+    "Real Estate Agent",
+    "Property Manager",
+    "Waiter",
+    "Cook",
+    "Chef",
+    "Bartender",
+    "Hotel Manager",
+    "Housekeeper",
+    "Cleaner",
+    "Security Guard",
+    "Worker",
+    "Machine Operator",
+    "Factory Worker",
+    "Assembler",
+    "Quality Control",
+    "Technician",
+    "Photographer",
+    "Musician",
+    "Artist",
+    "Journalist",
+    "Writer",
+    "Copywriter",
+    "Translator",
+    "Interpreter",
+    "Coach",
+    "Fitness Trainer",
+    "Farmer",
+    "Agronomist",
+    "Beautician",
+    "Hairdresser",
+    "Cosmetologist",
+    "Massage Therapist",
+    "Librarian",
+    "Social Worker",
+    "Caregiver",
+    "Babysitter",
+    "Nanny",
+    "Handyman",
+    "Locksmith",
+    "Auto Mechanic",
+    "Car Mechanic",
+    "Mover",
+    "Packer",
+]
+
+
 def get_vacancies(query: str, page: int = 0, per_page: int = 100, area: Optional[int] = None, date_from: Optional[str] = None) -> Dict[str, Any]:
     """
     Получает вакансии с HeadHunter API
@@ -199,25 +354,10 @@ def get_all_vacancies_for_profession(query: str, parse_all: bool = True, use_are
         print(f"Профессия: {query} - Найдено вакансий: {found} (превышает лимит {max_results})")
         print(f"Используем разбиение по регионам для получения большего количества...")
 
-        areas = [
-            (1, "Москва"),
-            (2, "Санкт-Петербург"),
-            (113, "Россия"),
-            (88, "Краснодар"),
-            (53, "Новосибирск"),
-            (66, "Екатеринбург"),
-            (54, "Казань"),
-            (26, "Ростов-на-Дону"),
-            (4, "Нижний Новгород"),
-            (76, "Челябинск"),
-            (3, "Воронеж"),
-            (99, "Самара"),
-            (95, "Уфа"),
-        ]
-
-        print(f"  Запрашиваем данные по {len(areas)} регионам...")
-
-        for area_id, area_name in areas:
+
+        print(f"  Запрашиваем данные по {len(AREAS)} регионам...")
+
+        for area_id, area_name in AREAS:
             area_vacancies = get_vacancies_by_area(query, area_id, area_name)
             all_vacancies.extend(area_vacancies)
             time.sleep(0.3)
@@ -365,146 +505,30 @@ def save_profession_data(profession: str, vacancies: List[Dict[str, Any]], base_
     save_to_json(data, filename)
 
 
+def load_profession_data(profession: str, base_folder: str = "parsed_jobs") -> List[Dict[str, Any]]:
+    """
+    Загружает ранее сохранённые вакансии профессии
+
+    Args:
+        profession: Название профессии
+        base_folder: Базовая папка (по умолчанию parsed_jobs)
+
+    Returns:
+        Список вакансий или пустой список, если данных ещё нет
+    """
+    filename = os.path.join(create_profession_folder(profession, base_folder), "data.json")
+    if not os.path.exists(filename):
+        return []
+
+    with open(filename, "r", encoding="utf-8") as file:
+        return json.load(file).get("vacancies", [])
+
+
 def main():
     """
     Основная функция для парсинга вакансий
     """
-    professions = [
-        "Developer",
-        "Programmer",
-        "Software Engineer",
-        "Backend Developer",
-        "Frontend Developer",
-        "Full Stack Developer",
-        "Python Developer",
-        "Java Developer",
-        "JavaScript Developer",
-        "DevOps Engineer",
-        "QA Engineer",
-        "Test Engineer",
-        "System Administrator",
-        "Database Administrator",
-        "Architect",
-        "Solution Architect",
-        "Data Engineer",
-        "Machine Learning Engineer",
-        "Data Scientist",
-        "Data Analyst",
-        "Business Analyst",
-        "Product Manager",
-        "Project Manager",
-        "Scrum Master",
-        "UI Designer",
-        "UX Designer",
-        "Web Designer",
-        "Graphic Designer",
-        "Marketing Manager",
-        "Sales Manager",
-        "HR Manager",
-        "Recruiter",
-        "Accountant",
-        "Financial Analyst",
-        "Lawyer",
-        "Consultant",
-        "Engineer",
-        "Mechanical Engineer",
-        "Electrical Engineer",
-        "Civil Engineer",
-        "Doctor",
-        "Nurse",
-        "Surgeon",
-        "Therapist",
-        "Pediatrician",
-        "Dentist",
-        "Pharmacist",
-        "Veterinarian",
-        "Medical Assistant",
-        "Psychologist",
-        "Psychiatrist",
-        "Teacher",
-        "Tutor",
-        "Professor",
-        "Educator",
-        "Instructor",
-        "Trainer",
-        "Sales Representative",
-        "Sales Assistant",
-        "Cashier",
-        "Store Manager",
-        "Retail Assistant",
-        "Merchandiser",
-        "Sales Consultant",
-        "Shop Assistant",
-        "Builder",
-        "Construction Worker",
-        "Plumber",
-        "Electrician",
-        "Welder",
-        "Carpenter",
-        "Mason",
-        "Painter",
-        "Roofer",
-        "Driver",
-        "Truck Driver",
-        "Delivery Driver",
-        "Taxi Driver",
-        "Logistics Manager",
-        "Dispatcher",
-        "Warehouse Worker",
-        "Loader",
-        "Courier",
-        "Banker",
-        "Loan Officer",
-        "Cashier Bank",
-        "Financial Advisor",
-        "Auditor",
-        "Bookkeeper",
-        "Realtor",
-        "Real Estate Agent",
-        "Property Manager",
-        "Waiter",
-        "Cook",
-        "Chef",
-        "Bartender",
-        "Hotel Manager",
-        "Housekeeper",
-        "Cleaner",
-        "Security Guard",
-        "Worker",
-        "Machine Operator",
-        "Factory Worker",
-        "Assembler",
-        "Quality Control",
-        "Technician",
-        "Photographer",
-        "Musician",
-        "Artist",
-        "Journalist",
-        "Writer",
-        "Copywriter",
-        "Translator",
-        "Interpreter",
-        "Coach",
-        "Fitness Trainer",
-        "Farmer",
-        "Agronomist",
-        "Beautician",
-        "Hairdresser",
-        "Cosmetologist",
-        "Massage Therapist",
-        "Librarian",
-        "Social Worker",
-        "Caregiver",
-        "Babysitter",
-        "Nanny",
-        "Handyman",
-        "Locksmith",
-        "Auto Mechanic",
-        "Car Mechanic",
-        "Mover",
-        "Packer",
-    ]
-
+    professions = PROFESSIONS
     print("="*60)
     print("НАЧИНАЮ ПАРСИНГ ВАКАНСИЙ С HEADHUNTER")
     print("="*60)
@@ -518,7 +542,18 @@ def main():
 
     os.makedirs("parsed_jobs", exist_ok=True)
     print("\nСоздана папка: parsed_jobs\n")
-    result_data = get_vacancies_for_professions(professions, parse_all=True, save_to_folders=True)
+
+    # Параллельный обход (hh_crawler.py); последовательный get_vacancies_for_professions остаётся для отладки
+    from hh_crawler import HHCrawler
+
+    async def crawl() -> Dict[str, Any]:
+        async with HHCrawler() as crawler:
+            # Вакансии пишутся в parsed_jobs/<профессия>/vacancies.jsonl по мере прихода страниц
+            return await crawler.get_vacancies_for_professions(
+                professions, parse_all=True, save_to_folders=True, storage_format="jsonl"
+            )
+
+    result_data = asyncio.run(crawl())
 
     print("\n" + "="*60)
     print("ФИНАЛЬНАЯ СТАТИСТИКА")
@@ -527,13 +562,12 @@ def main():
     print(f"Всего вакансий получено: {result_data['total_vacancies']}")
     print("\nДетализация по профессиям:")
     for profession, data in result_data["data"].items():
-        folder_name = profession.lower().strip()
-        folder_name = "".join(c if c.isalnum() or c in ('_', '-') else '_' for c in folder_name)
-        print(f"  - {profession:30} {data['count']:5} вакансий -> parsed_jobs/{folder_name}/data.json")
+        print(f"  - {profession:30} {data['count']:5} вакансий -> {data['file']}")
     
     print("\n" + "-"*60)
+    # Сами вакансии лежат в файлах профессий; здесь только сводка, чтобы не держать весь обход в памяти
     save_to_json(result_data, "vacancies_data.json")
-    print("Общие данные также сохранены в: vacancies_data.json")
+    print("Сводка по файлам сохранена в: vacancies_data.json")
     print("="*60)
     
     return result_data
@@ -1,9 +1,11 @@
 import json
 import os
-from typing import Dict
+from typing import Any, Dict, Iterator
 
 import requests
 
+from text_ai.salary_table import salary_prompt_block
+
 # URL вашего Hugging Face Inference Endpoint
 ENDPOINT_URL = "https://gzphg14ywuobq411.us-east4.gcp.endpoints.huggingface.cloud"
 
@@ -38,6 +40,10 @@ SYSTEM_PROMPT = """Ты генерируешь данные о професси
     
     Сгенерируй реалистичные данные для случайной IT-профессии. в распорядке дня мероприятий обязательно ровно 9 (формат: время - задача), они описаны коротко. сообщения коллег чередуются формальные с неформальными (но связанные с работой, возможно в шутливой форме). профессии могут быть абсолютно из лбых сфер, не обязательно IT. Формируй JSON на основе диалога с пользователем"""
 
+# Таблица зарплат из salary_stats.py: модель опирается на реальные цифры, а не придумывает их
+SALARY_STATS_PATH = os.getenv("SALARY_STATS_PATH", "parsed_jobs/salary_stats.json")
+SYSTEM_PROMPT += salary_prompt_block(SALARY_STATS_PATH)
+
 
 def _compose_prompt(user_prompt: str) -> str:
     user_prompt = user_prompt.strip()
@@ -46,24 +52,24 @@ def _compose_prompt(user_prompt: str) -> str:
     return f"{SYSTEM_PROMPT}\n\n{user_prompt}"
 
 
-def generate(
-    prompt: str,
-    max_new_tokens: int = 512,
-    temperature: float = 0.7,
-    top_p: float = 0.9,
-    do_sample: bool = True,
-) -> Dict:
-    """
-    Отправляет запрос к Hugging Face Inference Endpoint.
-    """
+def _headers() -> Dict[str, str]:
     headers = {
         "Content-Type": "application/json",
     }
 
     if HF_TOKEN:
         headers["Authorization"] = f"Bearer {HF_TOKEN}"
+    return headers
+
 
-    payload = {
+def _payload(
+    prompt: str,
+    max_new_tokens: int,
+    temperature: float,
+    top_p: float,
+    do_sample: bool,
+) -> Dict[str, Any]:
+    return {
         "inputs": _compose_prompt(prompt),
         "parameters": {
             "max_new_tokens": max_new_tokens,
@@ -73,10 +79,28 @@ def generate(
         },
     }
 
+
+def _format_conversation(messages: list[Dict[str, str]]) -> str:
+    conversation = "\n".join([f"{msg['role']}: {msg['content']}" for msg in messages])
+    return conversation + "\nassistant:"
+
+
+def generate(
+    prompt: str,
+    max_new_tokens: int = 512,
+    temperature: float = 0.7,
+    top_p: float = 0.9,
+    do_sample: bool = True,
+) -> Dict:
+    """
+    Отправляет запрос к Hugging Face Inference Endpoint.
+    """
+    payload = _payload(prompt, max_new_tokens, temperature, top_p, do_sample)
+
     try:
         response = requests.post(
             ENDPOINT_URL,
-            headers=headers,
+            headers=_headers(),
             json=payload,
             timeout=300,
         )
@@ -91,6 +115,45 @@ def generate(
         raise
 
 
+def generate_stream(
+    prompt: str,
+    max_new_tokens: int = 512,
+    temperature: float = 0.7,
+    top_p: float = 0.9,
+    do_sample: bool = True,
+) -> Iterator[str]:
+    """
+    Потоковый режим endpoint (stream=true): отдаёт текст по мере генерации токенов.
+    """
+    payload = _payload(prompt, max_new_tokens, temperature, top_p, do_sample)
+    payload["stream"] = True
+
+    with requests.post(
+        ENDPOINT_URL,
+        headers=_headers(),
+        json=payload,
+        timeout=300,
+        stream=True,
+    ) as response:
+        response.raise_for_status()
+        response.encoding = "utf-8"
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            event = json.loads(data)
+            if "error" in event:
+                raise RuntimeError(event["error"])
+            token = event.get("token") or {}
+            if token.get("special"):
+                continue
+            text = token.get("text")
+            if text:
+                yield text
+
+
 def chat(
     messages: list[Dict[str, str]],
     max_new_tokens: int = 512,
@@ -100,11 +163,25 @@ def chat(
     """
     Отправляет диалоговый запрос к endpoint.
     """
-    conversation = "\n".join([f"{msg['role']}: {msg['content']}" for msg in messages])
-    conversation += "\nassistant:"
-
     return generate(
-        prompt=conversation,
+        prompt=_format_conversation(messages),
+        max_new_tokens=max_new_tokens,
+        temperature=temperature,
+        top_p=top_p,
+    )
+
+
+def chat_stream(
+    messages: list[Dict[str, str]],
+    max_new_tokens: int = 512,
+    temperature: float = 0.7,
+    top_p: float = 0.9,
+) -> Iterator[str]:
+    """
+    Диалоговый запрос в потоковом режиме.
+    """
+    return generate_stream(
+        prompt=_format_conversation(messages),
         max_new_tokens=max_new_tokens,
         temperature=temperature,
         top_p=top_p,
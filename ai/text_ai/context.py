@@ -0,0 +1,122 @@
+"""Укладывание истории диалога в бюджет токенов промпта."""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+# Служебные токены на одно сообщение ("role: ...\n")
+MESSAGE_OVERHEAD_TOKENS = 4
+SUMMARY_PREFIX = "Краткое содержание начала диалога:"
+SUMMARY_SNIPPET_CHARS = 200
+
+
+def estimate_tokens(text: str) -> int:
+    """Грубая оценка числа токенов без токенизатора.
+
+    Латиница у BPE-токенизаторов даёт около 4 символов на токен,
+    кириллица и прочие не-ASCII символы — около 2.5.
+    """
+
+    if not text:
+        return 0
+    ascii_chars = sum(1 for char in text if char.isascii())
+    other_chars = len(text) - ascii_chars
+    return math.ceil(ascii_chars / 4 + other_chars / 2.5)
+
+
+def _message_tokens(message: Dict[str, str]) -> int:
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+@dataclass
+class CompactionResult:
+    messages: List[Dict[str, str]]
+    original_tokens: int
+    prompt_tokens: int
+    dropped_messages: int
+    summarized: bool
+
+    @property
+    def saved_tokens(self) -> int:
+        return max(0, self.original_tokens - self.prompt_tokens)
+
+
+class HistoryCompactor:
+    """Оставляет системный промпт и самые свежие реплики в пределах бюджета.
+
+    ``reserved_tokens`` — то, что добавляется к промпту всегда (системный
+    промпт). Последнее сообщение сохраняется даже при превышении бюджета.
+    С ``summarize=True`` отброшенные реплики заменяются одним системным
+    сообщением с их началом, если на него хватает места.
+    """
+
+    def __init__(self, budget_tokens: int, reserved_tokens: int = 0, summarize: bool = False) -> None:
+        self.budget_tokens = budget_tokens
+        self.reserved_tokens = reserved_tokens
+        self.summarize = summarize
+        self._requests = 0
+        self._compacted = 0
+        self._saved_tokens = 0
+
+    def compact(self, messages: List[Dict[str, str]]) -> CompactionResult:
+        costs = [_message_tokens(message) for message in messages]
+        original_tokens = self.reserved_tokens + sum(costs)
+        available = self.budget_tokens - self.reserved_tokens
+
+        kept_from = len(messages)
+        used = 0
+        for index in range(len(messages) - 1, -1, -1):
+            if kept_from < len(messages) and used + costs[index] > available:
+                break
+            used += costs[index]
+            kept_from = index
+
+        kept = messages[kept_from:]
+        dropped = messages[:kept_from]
+        summarized = False
+        if dropped and self.summarize:
+            summary = self._summary(dropped, available - used)
+            if summary is not None:
+                kept = [summary] + kept
+                used += _message_tokens(summary)
+                summarized = True
+
+        result = CompactionResult(
+            messages=kept,
+            original_tokens=original_tokens,
+            prompt_tokens=self.reserved_tokens + used,
+            dropped_messages=len(dropped),
+            summarized=summarized,
+        )
+        self._requests += 1
+        if dropped:
+            self._compacted += 1
+            self._saved_tokens += result.saved_tokens
+        return result
+
+    def _summary(self, dropped: List[Dict[str, str]], budget: int) -> Optional[Dict[str, str]]:
+        lines = [SUMMARY_PREFIX]
+        tokens = MESSAGE_OVERHEAD_TOKENS + estimate_tokens(SUMMARY_PREFIX)
+        for message in dropped:
+            snippet = " ".join(message["content"].split())[:SUMMARY_SNIPPET_CHARS]
+            line = f"- {message['role']}: {snippet}"
+            line_tokens = estimate_tokens(line) + 1
+            if tokens + line_tokens > budget:
+                break
+            lines.append(line)
+            tokens += line_tokens
+        if len(lines) == 1:
+            return None
+        return {"role": "system", "content": "\n".join(lines)}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "budget_tokens": self.budget_tokens,
+            "reserved_tokens": self.reserved_tokens,
+            "summarize": self.summarize,
+            "requests": self._requests,
+            "compacted_requests": self._compacted,
+            "saved_tokens_total": self._saved_tokens,
+        }
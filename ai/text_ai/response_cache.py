@@ -0,0 +1,160 @@
+"""Кэш ответов текстовой модели для одинаковых запросов."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent / "response_cache.db"
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+def cache_key(
+    messages: List[Dict[str, str]],
+    model: str,
+    max_new_tokens: int,
+    temperature: float,
+    top_p: float,
+    system_prompt: str = "",
+) -> str:
+    """Хэш запроса: нормализованная история + модель + параметры семплирования."""
+
+    material = {
+        "model": model,
+        "system": hashlib.sha256(system_prompt.encode("utf-8")).hexdigest(),
+        "messages": [[message["role"], _normalize(message["content"])] for message in messages],
+        "max_new_tokens": max_new_tokens,
+        "temperature": round(temperature, 4),
+        "top_p": round(top_p, 4),
+    }
+    encoded = json.dumps(material, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Двухуровневый кэш: LRU в памяти и SQLite-файл, переживающий перезапуск.
+
+    Записи живут ``ttl`` секунд. На диске хранится не больше
+    ``max_disk_entries`` самых свежих ответов.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl: float = 24 * 60 * 60,
+        db_path: Optional[Path] = DEFAULT_CACHE_PATH,
+        max_disk_entries: int = 50_000,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_disk_entries = max_disk_entries
+        self._memory: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._stores = 0
+
+        self._conn: Optional[sqlite3.Connection] = None
+        if db_path is not None:
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=5.0)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    text TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_responses_expires ON responses (expires_at)"
+            )
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[0] >= now:
+                self._memory.move_to_end(key)
+                self._hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._memory[key]
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT text, expires_at FROM responses WHERE key = ? AND expires_at >= ?",
+                    (key, now),
+                ).fetchone()
+                if row is not None:
+                    self._remember(key, row[0], row[1])
+                    self._hits += 1
+                    self._disk_hits += 1
+                    return row[0]
+
+            self._misses += 1
+            return None
+
+    def put(self, key: str, text: str) -> None:
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, text, expires_at)
+            self._stores += 1
+            if self._conn is None:
+                return
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, text, expires_at) VALUES (?, ?, ?)",
+                    (key, text, expires_at),
+                )
+                if self._stores % 100 == 0:
+                    self._prune_disk()
+
+    def _remember(self, key: str, text: str, expires_at: float) -> None:
+        self._memory[key] = (expires_at, text)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _prune_disk(self) -> None:
+        assert self._conn is not None
+        self._conn.execute("DELETE FROM responses WHERE expires_at < ?", (time.time(),))
+        self._conn.execute(
+            """
+            DELETE FROM responses WHERE key NOT IN (
+                SELECT key FROM responses ORDER BY expires_at DESC LIMIT ?
+            )
+            """,
+            (self.max_disk_entries,),
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memory_entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self._hits,
+            "disk_hits": self._disk_hits,
+            "misses": self._misses,
+            "stores": self._stores,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
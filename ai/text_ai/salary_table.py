@@ -0,0 +1,47 @@
+"""Готовая таблица зарплат (salary_stats.py) в виде блока системного промпта."""
+
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+
+def _money(value: float) -> str:
+    return f"{round(value):,}".replace(",", " ")
+
+
+def format_salary_table(stats: Dict[str, Any], max_professions: int = 20, top_areas: int = 3) -> str:
+    """Компактная текстовая таблица: медиана, межквартильный размах и крупнейшие регионы."""
+
+    professions = sorted(stats.get("professions", {}).items(), key=lambda item: -item[1]["count"])
+    if not professions:
+        return ""
+
+    lines = [
+        f"Реальные зарплаты по вакансиям HeadHunter ({stats.get('currency', 'RUR')}, медиана и 25–75 перцентили). "
+        "Опирайся на них, когда упоминаешь доходы и вакансии:"
+    ]
+    for name, row in professions[:max_professions]:
+        line = f"- {name}: {_money(row['median'])} ({_money(row['p25'])}–{_money(row['p75'])}), вакансий: {row['count']}"
+        areas = list(row.get("areas", {}).items())[:top_areas]
+        if areas:
+            line += "; " + ", ".join(f"{area}: {_money(area_row['median'])}" for area, area_row in areas)
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def salary_prompt_block(path: str) -> str:
+    """Блок для системного промпта или пустая строка, если таблица не собрана."""
+
+    stats_path = Path(path)
+    if not stats_path.exists():
+        return ""
+    try:
+        with open(stats_path, "r", encoding="utf-8") as file:
+            table = format_salary_table(json.load(file))
+    except (OSError, ValueError, KeyError) as exc:
+        logger.warning("Salary table %s is not usable: %s", stats_path, exc)
+        return ""
+    return f"\n\n{table}" if table else ""
@@ -0,0 +1,130 @@
+"""
+Потоковое хранение вакансий в формате JSON Lines
+
+Одна вакансия — одна строка JSON. Вакансии дописываются по мере прихода
+страниц и читаются построчно, поэтому память не растёт с размером обхода.
+Сжатие выбирается по расширению: .jsonl, .jsonl.gz (gzip) или .jsonl.zst
+(нужен пакет zstandard).
+"""
+
+import gzip
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Set, Union
+
+PathLike = Union[str, Path]
+
+JSONL_BASENAME = "vacancies"
+STORAGE_FORMATS = ("jsonl", "jsonl.gz", "jsonl.zst")
+# В порядке предпочтения при поиске данных профессии; data.json — старый формат save_profession_data
+PROFESSION_FILES = tuple(f"{JSONL_BASENAME}.{storage_format}" for storage_format in STORAGE_FORMATS) + ("data.json",)
+
+
+def open_text(path: PathLike, mode: str = "rt"):
+    """
+    Открывает текстовый файл, распаковывая/сжимая его по расширению
+
+    Args:
+        path: Путь к файлу (.gz — gzip, .zst — zstd, остальное — без сжатия)
+        mode: Режим открытия в текстовом виде ("rt", "wt", "at")
+    """
+    path = str(path)
+    if path.endswith(".gz"):
+        return gzip.open(path, mode, encoding="utf-8", compresslevel=6)
+    if path.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError as exception:
+            raise RuntimeError("Для файлов .zst нужен пакет zstandard (pip install zstandard)") from exception
+        return zstandard.open(path, mode, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class VacancyWriter:
+    """
+    Пишет вакансии в JSONL по одной, пропуская повторы по ID
+
+    Данные пишутся во временный файл и переименовываются в итоговый только
+    при успешном закрытии, так что оборванный обход не оставляет битый файл.
+
+    Args:
+        path: Итоговый файл (.jsonl, .jsonl.gz или .jsonl.zst)
+        unique: Пропускать вакансии с уже записанным ID
+    """
+
+    def __init__(self, path: PathLike, unique: bool = True):
+        self.path = Path(path)
+        self.unique = unique
+        self.count = 0
+        self.seen: Set[str] = set()
+        # Префикс, а не суффикс: расширение определяет сжатие в open_text
+        self._tmp_path = self.path.with_name(".tmp-" + self.path.name)
+        self._file = None
+
+    def __enter__(self) -> "VacancyWriter":
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open_text(self._tmp_path, "wt")
+        return self
+
+    def write(self, vacancy: Dict[str, Any]) -> bool:
+        """
+        Записывает вакансию; возвращает False, если она уже была
+        """
+        vacancy_id = vacancy.get("id")
+        if self.unique and vacancy_id:
+            if vacancy_id in self.seen:
+                return False
+            self.seen.add(vacancy_id)
+        self._file.write(json.dumps(vacancy, ensure_ascii=False, separators=(",", ":")))
+        self._file.write("\n")
+        self.count += 1
+        return True
+
+    def write_many(self, vacancies: Iterable[Dict[str, Any]]) -> int:
+        return sum(1 for vacancy in vacancies if self.write(vacancy))
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        self._file.close()
+        if exc_type is None:
+            os.replace(self._tmp_path, self.path)
+        else:
+            self._tmp_path.unlink(missing_ok=True)
+
+
+def iter_vacancies(path: PathLike) -> Iterator[Dict[str, Any]]:
+    """
+    Построчно читает вакансии из JSONL (в том числе сжатого)
+
+    Старый data.json разбирается потоково через ijson, если он установлен,
+    иначе читается целиком.
+    """
+    if str(path).endswith(".json"):
+        try:
+            import ijson
+        except ImportError:
+            ijson = None
+        if ijson is not None:
+            with open(path, "rb") as file:
+                # use_float: числа как float, а не Decimal — как у json.load
+                yield from ijson.items(file, "vacancies.item", use_float=True)
+            return
+        with open(path, "r", encoding="utf-8") as file:
+            yield from json.load(file).get("vacancies", [])
+        return
+
+    with open_text(path, "rt") as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def find_profession_file(folder: PathLike) -> Optional[Path]:
+    """
+    Файл с вакансиями профессии в папке (JSONL в приоритете перед data.json)
+    """
+    for name in PROFESSION_FILES:
+        candidate = Path(folder) / name
+        if candidate.exists():
+            return candidate
+    return None
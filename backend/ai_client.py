@@ -0,0 +1,181 @@
+"""Долгоживущий HTTP-клиент для обращений backend → ai-service."""
+
+from __future__ import annotations
+
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Таймауты на чтение по маршрутам ai-service (секунды)
+DEFAULT_ROUTE_TIMEOUTS: Dict[str, float] = {
+    "/text/chat": 120.0,
+    "/text/chat/stream": 120.0,
+    "/generate": 60.0,
+}
+
+
+def _env_float(name: str, default: float) -> float:
+    raw = os.getenv(name)
+    if raw is None or raw == "":
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        logger.warning("Invalid value for %s: %r, using %s", name, raw, default)
+        return default
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(_env_float(name, float(default)))
+
+
+def _env_flag(name: str, default: bool = False) -> bool:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    return raw.strip().lower() in {"1", "true", "yes", "on"}
+
+
+class AIServiceClient:
+    """Один пул соединений на всё приложение.
+
+    Клиент создаётся на старте приложения и закрывается на остановке,
+    поэтому keep-alive соединения к ai-service переиспользуются между
+    запросами. Для каждого маршрута можно задать свой таймаут чтения.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        connect_timeout: float = 5.0,
+        http2: bool = False,
+        route_timeouts: Optional[Dict[str, float]] = None,
+        default_timeout: float = 60.0,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.http2 = http2
+        self.route_timeouts = dict(DEFAULT_ROUTE_TIMEOUTS)
+        if route_timeouts:
+            self.route_timeouts.update(route_timeouts)
+        self.default_timeout = default_timeout
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._requests_total = 0
+        self._saturated_total = 0
+        self._errors_total = 0
+
+    @classmethod
+    def from_env(cls, base_url: str) -> "AIServiceClient":
+        chat_timeout = _env_float("AI_TIMEOUT_CHAT", DEFAULT_ROUTE_TIMEOUTS["/text/chat"])
+        return cls(
+            base_url,
+            max_connections=_env_int("AI_POOL_MAX_CONNECTIONS", 100),
+            max_keepalive_connections=_env_int("AI_POOL_MAX_KEEPALIVE", 20),
+            keepalive_expiry=_env_float("AI_POOL_KEEPALIVE_EXPIRY", 30.0),
+            connect_timeout=_env_float("AI_CONNECT_TIMEOUT", 5.0),
+            http2=_env_flag("AI_HTTP2"),
+            route_timeouts={
+                "/text/chat": chat_timeout,
+                "/text/chat/stream": chat_timeout,
+                "/generate": _env_float("AI_TIMEOUT_PICTURE", DEFAULT_ROUTE_TIMEOUTS["/generate"]),
+            },
+        )
+
+    async def start(self) -> None:
+        if self._client is not None:
+            return
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=limits,
+            timeout=httpx.Timeout(self.default_timeout, connect=self.connect_timeout),
+            http2=self.http2,
+        )
+        logger.info(
+            "AI client started: %s (max_connections=%s, http2=%s)",
+            self.base_url,
+            self.max_connections,
+            self.http2,
+        )
+
+    async def aclose(self) -> None:
+        if self._client is None:
+            return
+        await self._client.aclose()
+        self._client = None
+
+    def timeout_for(self, route: str) -> httpx.Timeout:
+        read_timeout = self.route_timeouts.get(route, self.default_timeout)
+        return httpx.Timeout(read_timeout, connect=self.connect_timeout)
+
+    @asynccontextmanager
+    async def _track(self) -> AsyncIterator[None]:
+        self._requests_total += 1
+        if self._in_flight >= self.max_connections:
+            # Запрос будет ждать свободного соединения в пуле
+            self._saturated_total += 1
+        self._in_flight += 1
+        self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        try:
+            yield
+        except httpx.RequestError:
+            self._errors_total += 1
+            raise
+        finally:
+            self._in_flight -= 1
+
+    def _require_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError("AI client is not started")
+        return self._client
+
+    async def post(self, route: str, json: Any) -> httpx.Response:
+        client = self._require_client()
+        async with self._track():
+            return await client.post(route, json=json, timeout=self.timeout_for(route))
+
+    @asynccontextmanager
+    async def stream(self, route: str, json: Any) -> AsyncIterator[httpx.Response]:
+        """POST с потоковым чтением ответа; таймаут маршрута действует между чанками."""
+        client = self._require_client()
+        async with self._track():
+            async with client.stream(
+                "POST", route, json=json, timeout=self.timeout_for(route)
+            ) as response:
+                yield response
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "base_url": self.base_url,
+            "started": self._client is not None,
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "max_keepalive_connections": self.max_keepalive_connections,
+            "in_flight": self._in_flight,
+            "peak_in_flight": self._peak_in_flight,
+            "saturation": round(self._in_flight / self.max_connections, 3)
+            if self.max_connections
+            else 0.0,
+            "requests_total": self._requests_total,
+            "saturated_total": self._saturated_total,
+            "errors_total": self._errors_total,
+        }
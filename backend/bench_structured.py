@@ -0,0 +1,104 @@
+"""Микро-бенчмарк извлечения JSON-карточек из ответа модели.
+
+Запуск: python bench_structured.py
+Сравнивает extract_structured со старым переборным разбором
+(json.loads на каждом префиксе, заканчивающемся на "}").
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from structured import JSON_MARKER, extract_structured
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+# Старый алгоритм квадратичный — дальше этого размера его не гоняем
+LEGACY_MAX_SIZE = 100_000
+
+CARD = {
+    "profession": "Инженер данных",
+    "tech_stack": ["Python", "Airflow", "Spark"],
+    "schedule": {"morning": ["09:00 - стендап"], "lunch": [], "evening": []},
+}
+
+
+def _legacy_parse(payload: str) -> Tuple[Optional[Dict[str, Any]], int]:
+    end_indices = [idx for idx, char in enumerate(payload) if char == "}"]
+    for end in reversed(end_indices):
+        try:
+            data = json.loads(payload[: end + 1].strip())
+            if isinstance(data, dict):
+                return data, end + 1
+        except json.JSONDecodeError:
+            continue
+    return None, 0
+
+
+def _legacy_extract(reply: str) -> Optional[Dict[str, Any]]:
+    first_brace = reply.find("{")
+    if first_brace == -1:
+        return None
+    return _legacy_parse(reply[first_brace:])[0]
+
+
+def _valid_reply(size: int) -> str:
+    card = dict(CARD, notes="x" * max(0, size - 300))
+    return f"Вот ваш рабочий день! {JSON_MARKER} {json.dumps(card, ensure_ascii=False)} Удачи!"
+
+
+def _many_closing_braces(size: int) -> str:
+    # Корректный объект, за которым идёт мусор из "}" — старый разбор пробует каждый префикс
+    body = json.dumps(CARD, ensure_ascii=False)
+    return "Ответ: " + body + " }" * max(0, (size - len(body)) // 2)
+
+
+def _unclosed_nesting(size: int) -> str:
+    return "Ответ: " + '{"a": ' * (size // 6)
+
+
+def _braces_in_strings(size: int) -> str:
+    noise = '"{}}{" ' * (size // 7)
+    return "Ответ: {" + f'"text": "{noise}", "ok": true' + "} хвост"
+
+
+def _broken_objects(size: int) -> str:
+    return "{x} " * (size // 4) + json.dumps(CARD, ensure_ascii=False)
+
+
+CASES: Dict[str, Callable[[int], str]] = {
+    "valid": _valid_reply,
+    "closing-braces": _many_closing_braces,
+    "unclosed-nesting": _unclosed_nesting,
+    "braces-in-strings": _braces_in_strings,
+    "broken-objects": _broken_objects,
+}
+
+
+def _timeit(func: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    print(f"{'case':20} {'size':>9} {'new, ms':>10} {'legacy, ms':>11}")
+    print("-" * 54)
+    for name, build in CASES.items():
+        for size in SIZES:
+            reply = build(size)
+            repeat = 5 if size <= 100_000 else 2
+            new = _timeit(lambda: extract_structured(reply, log_failures=False), repeat)
+            if size <= LEGACY_MAX_SIZE:
+                legacy = f"{_timeit(lambda: _legacy_extract(reply), 1) * 1000:11.2f}"
+            else:
+                legacy = f"{'—':>11}"
+            print(f"{name:20} {len(reply):9} {new * 1000:10.2f} {legacy}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Отложенная (write-behind) запись карточек в SQLite и файлы экспорта."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from storage import cards_file_name, get_cards_file_path, save_cards, save_cards_batch
+
+logger = logging.getLogger(__name__)
+
+# (порядковый номер, conversation_id, payload, время постановки в очередь)
+_Item = Tuple[int, str, Dict[str, Any], float]
+_MAX_ATTEMPTS = 3
+
+
+class CardWriteBehind:
+    """Очередь записи карточек, которая не блокирует event loop.
+
+    ``submit`` только кладёт карточки в память и сразу возвращает путь к
+    файлу экспорта. Фоновая задача собирает пачку (до ``batch_size`` штук
+    или ``batch_window`` секунд), вставляет её одной транзакцией и пишет
+    файлы в отдельном потоке. Пока пачка не записана, последние карточки
+    диалога доступны через ``pending``. При остановке очередь дописывается
+    до конца.
+    """
+
+    def __init__(self, batch_size: int = 64, batch_window: float = 0.05) -> None:
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self._queue: Optional["asyncio.Queue[Optional[_Item]]"] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._pending: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+        self._pending_files: Dict[str, str] = {}
+        self._unflushed: Dict[int, float] = {}
+        self._attempts: Dict[int, int] = {}
+        self._seq = 0
+        self._batches = 0
+        self._written = 0
+        self._errors = 0
+        self._dropped = 0
+        self._last_batch_size = 0
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run(), name="card-write-behind")
+
+    async def stop(self) -> None:
+        """Дописывает всё из очереди и останавливает фоновую задачу."""
+
+        if self._task is None or self._queue is None:
+            return
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+        self._queue = None
+
+    def submit(self, conversation_id: str, payload: Dict[str, Any]) -> Path:
+        if self._queue is None:
+            # Очередь не запущена (например, вне приложения) — пишем сразу
+            return save_cards(conversation_id, payload)
+
+        self._seq += 1
+        now = time.monotonic()
+        self._pending[conversation_id] = (self._seq, payload)
+        self._pending_files[cards_file_name(conversation_id)] = conversation_id
+        self._unflushed[self._seq] = now
+        self._queue.put_nowait((self._seq, conversation_id, payload, now))
+        return get_cards_file_path(conversation_id)
+
+    def pending(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._pending.get(conversation_id)
+        return entry[1] if entry else None
+
+    def pending_file(self, file_name: str) -> Optional[Dict[str, Any]]:
+        conversation_id = self._pending_files.get(file_name)
+        return self.pending(conversation_id) if conversation_id is not None else None
+
+    async def _run(self) -> None:
+        assert self._queue is not None
+        queue = self._queue
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await queue.get()
+            if item is None:
+                break
+            batch: List[_Item] = [item]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    next_item = await asyncio.wait_for(queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if next_item is None:
+                    stopping = True
+                    break
+                batch.append(next_item)
+            await self._flush(batch)
+
+        # Остановка: дописываем всё, что успели поставить в очередь
+        leftover: List[_Item] = []
+        while not queue.empty():
+            item = queue.get_nowait()
+            if item is not None:
+                leftover.append(item)
+        for start in range(0, len(leftover), self.batch_size):
+            await self._flush(leftover[start : start + self.batch_size], final=True)
+
+    async def _flush(self, batch: List[_Item], final: bool = False) -> None:
+        try:
+            await asyncio.to_thread(
+                save_cards_batch, [(conversation_id, payload) for _, conversation_id, payload, _ in batch]
+            )
+        except Exception as exc:  # pragma: no cover - ошибки диска/БД
+            self._errors += 1
+            logger.error("Failed to persist %s card payloads: %s", len(batch), exc)
+            self._retry(batch, final)
+            return
+
+        self._batches += 1
+        self._written += len(batch)
+        self._last_batch_size = len(batch)
+        for seq, conversation_id, _, _ in batch:
+            self._forget(seq, conversation_id)
+
+    def _retry(self, batch: List[_Item], final: bool) -> None:
+        for item in batch:
+            seq, conversation_id = item[0], item[1]
+            attempts = self._attempts.get(seq, 1)
+            if final or attempts >= _MAX_ATTEMPTS or self._queue is None:
+                self._dropped += 1
+                self._forget(seq, conversation_id)
+                continue
+            self._attempts[seq] = attempts + 1
+            self._queue.put_nowait(item)
+
+    def _forget(self, seq: int, conversation_id: str) -> None:
+        self._unflushed.pop(seq, None)
+        self._attempts.pop(seq, None)
+        entry = self._pending.get(conversation_id)
+        if entry is not None and entry[0] == seq:
+            # Более новых карточек для диалога в очереди нет
+            del self._pending[conversation_id]
+            self._pending_files.pop(cards_file_name(conversation_id), None)
+
+    def stats(self) -> Dict[str, Any]:
+        oldest = min(self._unflushed.values(), default=None)
+        return {
+            "running": self._task is not None,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "pending_conversations": len(self._pending),
+            "unflushed": len(self._unflushed),
+            "lag_seconds": round(time.monotonic() - oldest, 3) if oldest is not None else 0.0,
+            "batches": self._batches,
+            "written": self._written,
+            "last_batch_size": self._last_batch_size,
+            "errors": self._errors,
+            "dropped": self._dropped,
+        }
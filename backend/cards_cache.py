@@ -0,0 +1,100 @@
+"""Кэш последних карточек диалога для частых опросов с фронтенда."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from storage import cards_file_name
+
+
+def _etag(data: bytes) -> str:
+    return '"' + hashlib.sha1(data).hexdigest()[:20] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (value.strip() for value in if_none_match.split(","))
+    return any(value.removeprefix("W/") == etag for value in candidates)
+
+
+class CachedCards:
+    """Карточки диалога, сериализованные один раз вместе с ETag."""
+
+    __slots__ = ("conversation_id", "payload", "body", "etag", "file_body", "file_etag", "expires_at")
+
+    def __init__(self, conversation_id: str, payload: Dict[str, Any], file_url: Optional[str], ttl: float) -> None:
+        self.conversation_id = conversation_id
+        self.payload = payload
+        canonical = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+        self.file_body = canonical.encode("utf-8")
+        self.file_etag = _etag(self.file_body)
+        self.body = (
+            '{"data":' + canonical + ',"file":' + json.dumps(file_url, ensure_ascii=False) + "}"
+        ).encode("utf-8")
+        self.etag = _etag(self.body)
+        self.expires_at = time.monotonic() + ttl
+
+
+class CardsCache:
+    """LRU-кэш последних карточек по conversation_id.
+
+    Запись карточек обновляет кэш сразу, поэтому в пределах процесса он
+    согласован с БД. ``ttl`` ограничивает устаревание, если карточки
+    записал другой воркер.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 30.0) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._items: "OrderedDict[str, CachedCards]" = OrderedDict()
+        self._files: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._not_modified = 0
+
+    def put(self, conversation_id: str, payload: Dict[str, Any], file_url: Optional[str]) -> CachedCards:
+        entry = CachedCards(conversation_id, payload, file_url, self.ttl)
+        with self._lock:
+            self._items[conversation_id] = entry
+            self._items.move_to_end(conversation_id)
+            self._files[cards_file_name(conversation_id)] = conversation_id
+            while len(self._items) > self.max_entries:
+                evicted, _ = self._items.popitem(last=False)
+                self._files.pop(cards_file_name(evicted), None)
+        return entry
+
+    def get(self, conversation_id: str) -> Optional[CachedCards]:
+        with self._lock:
+            entry = self._items.get(conversation_id)
+            if entry is None or entry.expires_at < time.monotonic():
+                self._misses += 1
+                return None
+            self._items.move_to_end(conversation_id)
+            self._hits += 1
+            return entry
+
+    def get_by_file(self, file_name: str) -> Optional[CachedCards]:
+        conversation_id = self._files.get(file_name)
+        return self.get(conversation_id) if conversation_id is not None else None
+
+    def record_not_modified(self) -> None:
+        self._not_modified += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._items),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self._hits,
+            "misses": self._misses,
+            "not_modified": self._not_modified,
+        }
@@ -0,0 +1,294 @@
+"""Хранилища истории диалогов: в памяти (LRU + TTL) и в SQLite (WAL)."""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from storage import BASE_DIR, SQLitePool
+
+Message = Dict[str, str]
+
+CONVERSATIONS_DB_PATH = BASE_DIR / "conversations.db"
+DEFAULT_IDLE_TTL = 24 * 60 * 60
+DEFAULT_BYTE_BUDGET = 64 * 1024 * 1024
+# Примерные накладные расходы на одно сообщение (dict + две строки)
+_MESSAGE_OVERHEAD = 200
+
+
+def _message_size(message: Message) -> int:
+    return len(message["role"]) + len(message["content"].encode("utf-8")) + _MESSAGE_OVERHEAD
+
+
+class ConversationStore:
+    """Общий интерфейс хранилищ истории диалогов."""
+
+    def get(self, conversation_id: str) -> List[Message]:
+        raise NotImplementedError
+
+    def append(self, conversation_id: str, message: Message) -> List[Message]:
+        """Добавляет сообщение и возвращает всю историю диалога."""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryConversationStore(ConversationStore):
+    """История в памяти процесса.
+
+    Диалоги упорядочены по последнему обращению: простаивающие дольше
+    ``idle_ttl`` секунд и самые старые при превышении ``byte_budget``
+    вытесняются первыми.
+    """
+
+    def __init__(self, idle_ttl: float = DEFAULT_IDLE_TTL, byte_budget: int = DEFAULT_BYTE_BUDGET) -> None:
+        self.idle_ttl = idle_ttl
+        self.byte_budget = byte_budget
+        self._items: "OrderedDict[str, tuple[float, List[Message], int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._evicted_idle = 0
+        self._evicted_budget = 0
+
+    def get(self, conversation_id: str) -> List[Message]:
+        with self._lock:
+            self._evict_idle(time.monotonic())
+            entry = self._items.get(conversation_id)
+            if entry is None:
+                return []
+            _, messages, size = entry
+            self._items[conversation_id] = (time.monotonic(), messages, size)
+            self._items.move_to_end(conversation_id)
+            return list(messages)
+
+    def append(self, conversation_id: str, message: Message) -> List[Message]:
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            _, messages, size = self._items.pop(conversation_id, (now, [], 0))
+            messages.append(message)
+            added = _message_size(message)
+            self._items[conversation_id] = (now, messages, size + added)
+            self._bytes += added
+            self._evict_over_budget(keep=conversation_id)
+            return list(messages)
+
+    def _evict_idle(self, now: float) -> None:
+        while self._items:
+            conversation_id, (last_access, _, size) = next(iter(self._items.items()))
+            if now - last_access <= self.idle_ttl:
+                break
+            del self._items[conversation_id]
+            self._bytes -= size
+            self._evicted_idle += 1
+
+    def _evict_over_budget(self, keep: str) -> None:
+        while self._bytes > self.byte_budget and len(self._items) > 1:
+            conversation_id = next(iter(self._items))
+            if conversation_id == keep:
+                break
+            _, _, size = self._items.pop(conversation_id)
+            self._bytes -= size
+            self._evicted_budget += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "conversations": len(self._items),
+                "messages": sum(len(messages) for _, messages, _ in self._items.values()),
+                "bytes": self._bytes,
+                "byte_budget": self.byte_budget,
+                "idle_ttl": self.idle_ttl,
+                "evicted_idle": self._evicted_idle,
+                "evicted_budget": self._evicted_budget,
+            }
+
+
+class SQLiteConversationStore(ConversationStore):
+    """История в SQLite-файле в режиме WAL.
+
+    Переживает перезапуск и доступна всем воркерам uvicorn на одной машине.
+    Вытеснение по простою и объёму выполняется не чаще раза в
+    ``sweep_interval`` секунд.
+    """
+
+    def __init__(
+        self,
+        db_path: Path = CONVERSATIONS_DB_PATH,
+        idle_ttl: float = DEFAULT_IDLE_TTL,
+        byte_budget: int = DEFAULT_BYTE_BUDGET,
+        sweep_interval: float = 60.0,
+        pool_size: int = 4,
+    ) -> None:
+        self.db_path = db_path
+        self.idle_ttl = idle_ttl
+        self.byte_budget = byte_budget
+        self.sweep_interval = sweep_interval
+        self._last_sweep = 0.0
+        self._evicted_idle = 0
+        self._evicted_budget = 0
+
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._pool = SQLitePool(db_path, size=pool_size)
+        with self._pool.connection() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS conversations (
+                    conversation_id TEXT PRIMARY KEY,
+                    last_access REAL NOT NULL,
+                    bytes INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS idx_conversations_last_access
+                ON conversations (last_access);
+                CREATE TABLE IF NOT EXISTS conversation_messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    conversation_id TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_messages_conversation
+                ON conversation_messages (conversation_id, id);
+                """
+            )
+
+    @staticmethod
+    def _select(conn: sqlite3.Connection, conversation_id: str) -> List[Message]:
+        rows = conn.execute(
+            "SELECT role, content FROM conversation_messages WHERE conversation_id = ? ORDER BY id",
+            (conversation_id,),
+        ).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def get(self, conversation_id: str) -> List[Message]:
+        now = time.time()
+        with self._pool.connection() as conn:
+            with conn:
+                cursor = conn.execute(
+                    "UPDATE conversations SET last_access = ? WHERE conversation_id = ? AND last_access >= ?",
+                    (now, conversation_id, now - self.idle_ttl),
+                )
+            if cursor.rowcount == 0:
+                return []
+            return self._select(conn, conversation_id)
+
+    def append(self, conversation_id: str, message: Message) -> List[Message]:
+        now = time.time()
+        with self._pool.connection() as conn:
+            with conn:
+                row = conn.execute(
+                    "SELECT last_access FROM conversations WHERE conversation_id = ?",
+                    (conversation_id,),
+                ).fetchone()
+                if row is not None and now - row[0] > self.idle_ttl:
+                    # Диалог простоял дольше TTL, но ещё не вычищен — начинаем заново
+                    self._delete(conn, [conversation_id])
+                    self._evicted_idle += 1
+                conn.execute(
+                    "INSERT INTO conversation_messages (conversation_id, role, content) VALUES (?, ?, ?)",
+                    (conversation_id, message["role"], message["content"]),
+                )
+                conn.execute(
+                    """
+                    INSERT INTO conversations (conversation_id, last_access, bytes) VALUES (?, ?, ?)
+                    ON CONFLICT (conversation_id)
+                    DO UPDATE SET last_access = excluded.last_access, bytes = bytes + excluded.bytes
+                    """,
+                    (conversation_id, now, _message_size(message)),
+                )
+            if now - self._last_sweep >= self.sweep_interval:
+                self._sweep(conn, now, keep=conversation_id)
+            return self._select(conn, conversation_id)
+
+    @staticmethod
+    def _delete(conn: sqlite3.Connection, conversation_ids: List[str]) -> None:
+        conn.executemany(
+            "DELETE FROM conversation_messages WHERE conversation_id = ?",
+            [(cid,) for cid in conversation_ids],
+        )
+        conn.executemany(
+            "DELETE FROM conversations WHERE conversation_id = ?",
+            [(cid,) for cid in conversation_ids],
+        )
+
+    def _sweep(self, conn: sqlite3.Connection, now: float, keep: str) -> None:
+        self._last_sweep = now
+        with conn:
+            idle = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT conversation_id FROM conversations WHERE last_access < ?",
+                    (now - self.idle_ttl,),
+                )
+            ]
+            self._delete(conn, idle)
+            self._evicted_idle += len(idle)
+
+            (total,) = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM conversations").fetchone()
+            if total <= self.byte_budget:
+                return
+            over_budget: List[str] = []
+            for conversation_id, size in conn.execute(
+                "SELECT conversation_id, bytes FROM conversations ORDER BY last_access"
+            ).fetchall():
+                if total <= self.byte_budget:
+                    break
+                if conversation_id == keep:
+                    continue
+                over_budget.append(conversation_id)
+                total -= size
+            self._delete(conn, over_budget)
+            self._evicted_budget += len(over_budget)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._pool.connection() as conn:
+            conversations, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM conversations"
+            ).fetchone()
+            (messages,) = conn.execute("SELECT COUNT(*) FROM conversation_messages").fetchone()
+            (page_count,) = conn.execute("PRAGMA page_count").fetchone()
+            (page_size,) = conn.execute("PRAGMA page_size").fetchone()
+        return {
+            "backend": "sqlite",
+            "path": str(self.db_path),
+            "conversations": conversations,
+            "messages": messages,
+            "bytes": total,
+            "byte_budget": self.byte_budget,
+            "idle_ttl": self.idle_ttl,
+            "file_bytes": page_count * page_size,
+            "evicted_idle": self._evicted_idle,
+            "evicted_budget": self._evicted_budget,
+            "pool": self._pool.stats(),
+        }
+
+    def close(self) -> None:
+        self._pool.close()
+
+
+def create_conversation_store() -> ConversationStore:
+    """Выбирает хранилище по переменной окружения CONVERSATION_STORE (memory|sqlite)."""
+
+    backend = os.getenv("CONVERSATION_STORE", "memory").strip().lower()
+    idle_ttl = float(os.getenv("CONVERSATION_IDLE_TTL", DEFAULT_IDLE_TTL))
+    byte_budget = int(os.getenv("CONVERSATION_BYTE_BUDGET", DEFAULT_BYTE_BUDGET))
+
+    if backend == "sqlite":
+        db_path: Optional[str] = os.getenv("CONVERSATION_DB_PATH")
+        return SQLiteConversationStore(
+            Path(db_path) if db_path else CONVERSATIONS_DB_PATH,
+            idle_ttl=idle_ttl,
+            byte_budget=byte_budget,
+        )
+    if backend != "memory":
+        raise ValueError(f"Unknown CONVERSATION_STORE: {backend}")
+    return MemoryConversationStore(idle_ttl=idle_ttl, byte_budget=byte_budget)
@@ -2,27 +2,36 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 import os
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 import httpx
 
 from pydantic import BaseModel, Field
 from uuid import uuid4
 
+from ai_client import AIServiceClient
+from card_writer import CardWriteBehind
+from cards_cache import CardsCache, etag_matches
+from conversations import create_conversation_store
 from prof_test import CareerAdvisor
+from recommendation_cache import create_recommendation_cache
 from storage import (
     CARDS_DIR,
+    close_db,
+    db_stats,
     fetch_latest_cards,
     get_cards_file_path,
     init_db,
-    save_cards,
 )
+from structured import StructuredStreamParser, extract_structured
+from vacancies_db import VacancyIndex
 
 logger = logging.getLogger(__name__)
 
@@ -36,17 +45,47 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
-app.mount("/cards", StaticFiles(directory=str(CARDS_DIR)), name="cards")
-
 AI_SERVICE_URL = os.getenv("AI_SERVICE_URL", "http://localhost:8500")
-JSON_MARKER = "<<JSON>>"
+PROFESSION_BATCH_CONCURRENCY = int(os.getenv("PROFESSION_BATCH_CONCURRENCY", 4))
+PROFESSION_BATCH_MAX_ITEMS = int(os.getenv("PROFESSION_BATCH_MAX_ITEMS", 500))
+
+_AI_CLIENT = AIServiceClient.from_env(AI_SERVICE_URL)
+_CARDS_CACHE = CardsCache(
+    max_entries=int(os.getenv("CARDS_CACHE_SIZE", 1024)),
+    ttl=float(os.getenv("CARDS_CACHE_TTL", 30.0)),
+)
+_CARD_WRITER = CardWriteBehind(
+    batch_size=int(os.getenv("CARDS_BATCH_SIZE", 64)),
+    batch_window=float(os.getenv("CARDS_BATCH_WINDOW", 0.05)),
+)
 
 
 @app.on_event("startup")
-def _startup() -> None:
+async def _startup() -> None:
     init_db()
+    await _CARD_WRITER.start()
+
+
+@app.on_event("startup")
+async def _start_ai_client() -> None:
+    await _AI_CLIENT.start()
+
+
+@app.on_event("shutdown")
+async def _stop_ai_client() -> None:
+    await _AI_CLIENT.aclose()
+    await _ADVISOR.aclose()
+
+
+@app.on_event("shutdown")
+async def _shutdown() -> None:
+    # Сначала дописываем отложенные карточки, потом закрываем пул БД
+    await _CARD_WRITER.stop()
+    _CONVERSATIONS.close()
+    close_db()
 
 
 class ChatMessage(BaseModel):
@@ -56,6 +95,9 @@ class ChatMessage(BaseModel):
     conversation_id: Optional[str] = Field(
         default=None, description="Идентификатор сессии (если есть)"
     )
+    allow_cached: bool = Field(
+        default=False, description="Можно ли ответить сохранённым ответом на такой же диалог"
+    )
 
 
 class ChatResponse(BaseModel):
@@ -91,6 +133,17 @@ class ProfRecommendation(BaseModel):
     recommendation: str
 
 
+class ProfBatchRequest(BaseModel):
+    items: List[ProfTestAnswers] = Field(..., min_length=1, max_length=PROFESSION_BATCH_MAX_ITEMS)
+
+
+class VacancySearchResponse(BaseModel):
+    items: List[Dict[str, Any]]
+    total: int
+    page: int
+    per_page: int
+
+
 class PictureRequest(BaseModel):
     prompt: str = Field(..., min_length=1)
     negative_prompt: Optional[str] = None
@@ -105,9 +158,11 @@ class PictureResponse(BaseModel):
     url: str
 
 
-# In-memory "хранилище" под текущую сессию: conversation_id -> list of messages
-_CHAT_HISTORY: Dict[str, List[Dict[str, str]]] = {}
-_ADVISOR = CareerAdvisor()
+# История диалогов: conversation_id -> list of messages (см. conversations.py)
+_CONVERSATIONS = create_conversation_store()
+_ADVISOR = CareerAdvisor(cache=create_recommendation_cache())
+# Вакансии HeadHunter, загруженные через `python vacancies_db.py ingest`
+_VACANCIES = VacancyIndex()
 
 
 @app.get("/health", response_model=dict[str, str])
@@ -115,42 +170,44 @@ def healthcheck() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/metrics", response_model=dict[str, Any])
+def metrics() -> dict[str, Any]:
+    return {
+        "ai_client": _AI_CLIENT.stats(),
+        "conversations": _CONVERSATIONS.stats(),
+        "cards_db": db_stats(),
+        "cards_writer": _CARD_WRITER.stats(),
+        "cards_cache": _CARDS_CACHE.stats(),
+        "profession": _ADVISOR.stats(),
+        "vacancies": _VACANCIES.stats(),
+    }
+
+
 @app.post("/api/chat", response_model=ChatResponse, responses={400: {"model": ErrorResponse}})
 async def chat_endpoint(payload: ChatMessage) -> ChatResponse:
     """Получает сообщение от пользователя и возвращает "ответ" от ИИ."""
 
     conversation_id = payload.conversation_id or str(uuid4())
-    history = _CHAT_HISTORY.setdefault(conversation_id, [])
 
     message = payload.message.strip()
     if not message:
         raise HTTPException(status_code=400, detail="Пустое сообщение")
 
-    history.append({"role": "user", "content": message})
+    history = _CONVERSATIONS.append(conversation_id, {"role": "user", "content": message})
 
     try:
-        ai_reply = await _call_text_ai(history)
+        ai_reply = await _call_text_ai(history, payload.allow_cached)
     except Exception as exc:
         # Фолбэк на заглушку, если сервис недоступен, но историю не рушим
         ai_reply = _fake_ai_reply(message)
         logger.error("Text AI call failed: %s", exc)
 
-    reply_text, structured_payload = _extract_structured(ai_reply)
-
-    history.append({"role": "assistant", "content": reply_text})
+    reply_text, structured_payload = extract_structured(ai_reply)
+    structured_payload = await _with_real_vacancies(structured_payload)
 
-    cards_file_url: Optional[str] = None
+    history = _CONVERSATIONS.append(conversation_id, {"role": "assistant", "content": reply_text})
 
-    if structured_payload:
-        try:
-            file_path = save_cards(conversation_id, structured_payload)
-            cards_file_url = f"/cards/{file_path.name}"
-        except Exception as exc:  # pragma: no cover - логирование ошибок БД
-            logger.error("Failed to store structured data: %s", exc)
-    else:
-        file_path = get_cards_file_path(conversation_id)
-        if file_path.exists():
-            cards_file_url = f"/cards/{file_path.name}"
+    cards_file_url = _store_cards(conversation_id, structured_payload)
 
     return ChatResponse(
         reply=reply_text,
@@ -161,51 +218,278 @@ async def chat_endpoint(payload: ChatMessage) -> ChatResponse:
     )
 
 
-@app.get("/api/conversation/{conversation_id}/cards", response_model=CardsResponse)
-def conversation_cards(conversation_id: str) -> CardsResponse:
-    payload = fetch_latest_cards(conversation_id)
-    if payload is None:
-        raise HTTPException(status_code=404, detail="Карточки не найдены")
+@app.post("/api/chat/stream", responses={400: {"model": ErrorResponse}})
+async def chat_stream_endpoint(payload: ChatMessage) -> StreamingResponse:
+    """Потоковый вариант /api/chat: токены и карточки отдаются через Server-Sent Events.
+
+    События: ``meta`` (conversation_id), ``token`` (кусок текста ответа),
+    ``cards`` (JSON карточек, как только закрылся блок после маркера) и
+    ``done`` с итоговым ответом в том же виде, что и у /api/chat.
+    """
+
+    conversation_id = payload.conversation_id or str(uuid4())
+
+    message = payload.message.strip()
+    if not message:
+        raise HTTPException(status_code=400, detail="Пустое сообщение")
+
+    history = _CONVERSATIONS.append(conversation_id, {"role": "user", "content": message})
+
+    return StreamingResponse(
+        _chat_events(conversation_id, history, message, payload.allow_cached),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _chat_events(
+    conversation_id: str, history: List[Dict[str, str]], message: str, allow_cached: bool = False
+) -> AsyncIterator[str]:
+    yield _sse("meta", {"conversation_id": conversation_id})
+
+    parser = StructuredStreamParser()
+    try:
+        async for chunk in _stream_text_ai(history, allow_cached):
+            for event, data in parser.feed(chunk):
+                yield _sse(event, data)
+    except Exception as exc:
+        logger.error("Text AI stream failed: %s", exc)
+        if not parser.text:
+            for event, data in parser.feed(_fake_ai_reply(message)):
+                yield _sse(event, data)
+
+    for event, data in parser.close():
+        yield _sse(event, data)
+
+    reply_text, structured_payload = extract_structured(parser.text)
+    structured_payload = await _with_real_vacancies(structured_payload)
+    _CONVERSATIONS.append(conversation_id, {"role": "assistant", "content": reply_text})
+    cards_file_url = _store_cards(conversation_id, structured_payload)
+
+    yield _sse(
+        "done",
+        {
+            "reply": reply_text,
+            "conversation_id": conversation_id,
+            "structured_data": structured_payload,
+            "cards_file": cards_file_url,
+        },
+    )
+
+
+async def _with_real_vacancies(structured_payload: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Подменяет придуманные моделью вакансии в growth_table реальными из индекса HeadHunter."""
+
+    if not structured_payload or not _VACANCIES.available:
+        return structured_payload
+    growth_table = structured_payload.get("growth_table")
+    profession = structured_payload.get("profession")
+    if not isinstance(growth_table, dict) or not isinstance(profession, str):
+        return structured_payload
+
+    try:
+        openings = await asyncio.to_thread(_VACANCIES.openings_for_card, profession)
+    except Exception as exc:  # pragma: no cover - битая или недоступная БД
+        logger.error("Vacancy lookup failed: %s", exc)
+        return structured_payload
+    if openings:
+        growth_table["vacancies"] = openings
+    return structured_payload
+
+
+def _store_cards(conversation_id: str, structured_payload: Optional[Dict[str, Any]]) -> Optional[str]:
+    if structured_payload:
+        # Запись в БД и файл идёт в фоне; до неё карточки отдаются из очереди
+        file_path = _CARD_WRITER.submit(conversation_id, structured_payload)
+        file_url = f"/cards/{file_path.name}"
+        _CARDS_CACHE.put(conversation_id, structured_payload, file_url)
+        return file_url
+
+    entry = _CARDS_CACHE.get(conversation_id)
+    if entry is not None:
+        return f"/cards/{get_cards_file_path(conversation_id).name}"
+    return _cards_file_url(conversation_id)
+
+
+@app.get(
+    "/api/conversation/{conversation_id}/cards",
+    response_model=CardsResponse,
+    responses={304: {"description": "Карточки не изменились"}},
+)
+async def conversation_cards(conversation_id: str, request: Request) -> Response:
+    """Последние карточки диалога с поддержкой ETag / If-None-Match.
+
+    Повторный опрос обслуживается из кэша в памяти и, если карточки не
+    менялись, возвращает 304 без тела.
+    """
+
+    entry = _CARDS_CACHE.get(conversation_id)
+    if entry is None:
+        payload = _CARD_WRITER.pending(conversation_id)
+        if payload is None:
+            payload = await asyncio.to_thread(fetch_latest_cards, conversation_id)
+        if payload is None:
+            raise HTTPException(status_code=404, detail="Карточки не найдены")
+        entry = _CARDS_CACHE.put(conversation_id, payload, _cards_file_url(conversation_id))
+    return _cached_response(request, entry.body, entry.etag)
+
+
+@app.get("/cards/{file_name}", include_in_schema=False)
+def cards_file(file_name: str, request: Request) -> Response:
+    """Файл экспорта карточек.
+
+    Пока запись стоит в очереди, отдаём свежие карточки из памяти, иначе
+    на диске лежала бы предыдущая версия файла.
+    """
+
+    entry = _CARDS_CACHE.get_by_file(file_name)
+    if entry is not None:
+        return _cached_response(request, entry.file_body, entry.file_etag)
+    payload = _CARD_WRITER.pending_file(file_name)
+    if payload is not None:
+        return JSONResponse(payload)
+    file_path = CARDS_DIR / file_name
+    if not file_path.is_file():
+        raise HTTPException(status_code=404, detail="Not Found")
+    return FileResponse(file_path, media_type="application/json")
+
+
+def _cards_file_url(conversation_id: str) -> Optional[str]:
     file_path = get_cards_file_path(conversation_id)
-    file_url = f"/cards/{file_path.name}" if file_path.exists() else None
-    return CardsResponse(data=payload, file=file_url)
+    if file_path.exists() or _CARD_WRITER.pending(conversation_id) is not None:
+        return f"/cards/{file_path.name}"
+    return None
 
 
-@app.post("/api/profession", response_model=ProfRecommendation)
-def profession_endpoint(payload: ProfTestAnswers) -> ProfRecommendation:
-    """Возвращает рекомендацию профессии на основе результатов теста."""
+def _cached_response(request: Request, body: bytes, etag: str) -> Response:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        _CARDS_CACHE.record_not_modified()
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
-    answers = {
+
+def _profession_answers(payload: ProfTestAnswers) -> Dict[str, Any]:
+    return {
         key: value
-        for key, value in payload.dict().items()
+        for key, value in payload.model_dump().items()
         if value not in (None, "", [], {})
     }
 
+
+@app.post("/api/profession", response_model=ProfRecommendation)
+async def profession_endpoint(payload: ProfTestAnswers) -> ProfRecommendation:
+    """Возвращает рекомендацию профессии на основе результатов теста."""
+
+    answers = _profession_answers(payload)
+
     try:
-        recommendation_text = _ADVISOR.get_recommendation(answers)
+        recommendation_text = await _ADVISOR.aget_recommendation(answers)
     except Exception as exc:  # pragma: no cover - сетевые ошибки
         raise HTTPException(status_code=502, detail=str(exc)) from exc
 
     return ProfRecommendation(recommendation=recommendation_text)
 
 
+@app.post("/api/profession/batch")
+async def profession_batch_endpoint(payload: ProfBatchRequest) -> StreamingResponse:
+    """Рекомендации для набора анкет, построчно в NDJSON по мере готовности.
+
+    Каждая строка — ``{"index": i, "recommendation": ...}`` или
+    ``{"index": i, "error": ...}``, где ``i`` — позиция анкеты в запросе.
+    Одинаковые анкеты считаются один раз, к GigaChat одновременно идёт не
+    больше PROFESSION_BATCH_CONCURRENCY запросов.
+    """
+
+    groups: Dict[str, Tuple[Dict[str, Any], List[int]]] = {}
+    for index, item in enumerate(payload.items):
+        answers = _profession_answers(item)
+        key = _ADVISOR.answers_key(answers)
+        groups.setdefault(key, (answers, []))[1].append(index)
+
+    return StreamingResponse(
+        _profession_batch_lines(list(groups.values())),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _profession_batch_lines(groups: List[Tuple[Dict[str, Any], List[int]]]) -> AsyncIterator[str]:
+    semaphore = asyncio.Semaphore(PROFESSION_BATCH_CONCURRENCY)
+
+    async def recommend(answers: Dict[str, Any], indices: List[int]) -> Tuple[List[int], Dict[str, Any]]:
+        async with semaphore:
+            try:
+                text = await _ADVISOR.aget_recommendation(answers, raise_errors=True)
+            except Exception as exc:  # pragma: no cover - сетевые ошибки
+                logger.error("Profession batch item failed: %s", exc)
+                return indices, {"error": str(exc)}
+        return indices, {"recommendation": text}
+
+    tasks = [asyncio.create_task(recommend(answers, indices)) for answers, indices in groups]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            indices, result = await finished
+            for index in indices:
+                yield json.dumps({"index": index, **result}, ensure_ascii=False) + "\n"
+    finally:
+        # Клиент отключился — незачем дальше ходить в GigaChat
+        for task in tasks:
+            task.cancel()
+
+
+@app.get("/api/vacancies", response_model=VacancySearchResponse, responses={503: {"model": ErrorResponse}})
+async def vacancies_endpoint(
+    profession: Optional[str] = None,
+    q: Optional[str] = None,
+    area: Optional[str] = None,
+    experience: Optional[str] = None,
+    schedule: Optional[str] = None,
+    salary_min: Optional[int] = Query(None, ge=0),
+    salary_max: Optional[int] = Query(None, ge=0),
+    currency: Optional[str] = None,
+    published_from: Optional[str] = None,
+    page: int = Query(0, ge=0),
+    per_page: int = Query(20, ge=1, le=100),
+) -> VacancySearchResponse:
+    """Поиск по загруженным вакансиям HeadHunter: фильтры, полнотекстовый запрос q и пагинация."""
+
+    if not _VACANCIES.available:
+        raise HTTPException(status_code=503, detail="База вакансий не загружена")
+
+    result = await asyncio.to_thread(
+        _VACANCIES.search,
+        profession=profession,
+        text=q,
+        area=area,
+        experience=experience,
+        schedule=schedule,
+        salary_min=salary_min,
+        salary_max=salary_max,
+        currency=currency,
+        published_from=published_from,
+        page=page,
+        per_page=per_page,
+    )
+    return VacancySearchResponse(**result)
+
+
 @app.post("/api/picture", response_model=PictureResponse)
 async def generate_picture(payload: PictureRequest) -> PictureResponse:
     if not AI_SERVICE_URL:
         raise HTTPException(status_code=500, detail="AI service URL is not configured")
 
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        try:
-            response = await client.post(
-                f"{AI_SERVICE_URL.rstrip('/')}/generate",
-                json=payload.model_dump(exclude_none=True),
-            )
-            response.raise_for_status()
-        except httpx.HTTPStatusError as exc:
-            detail = exc.response.json().get("detail") if exc.response.content else str(exc)
-            raise HTTPException(status_code=exc.response.status_code, detail=detail) from exc
-        except httpx.RequestError as exc:
-            raise HTTPException(status_code=502, detail=f"AI service unreachable: {exc}") from exc
+    try:
+        response = await _AI_CLIENT.post(
+            "/generate",
+            json=payload.model_dump(exclude_none=True),
+        )
+        response.raise_for_status()
+    except httpx.HTTPStatusError as exc:
+        detail = exc.response.json().get("detail") if exc.response.content else str(exc)
+        raise HTTPException(status_code=exc.response.status_code, detail=detail) from exc
+    except httpx.RequestError as exc:
+        raise HTTPException(status_code=502, detail=f"AI service unreachable: {exc}") from exc
 
     data = response.json()
     url = data.get("url")
@@ -224,22 +508,21 @@ def _fake_ai_reply(user_text: str) -> str:
     return f"Я услышал: '{user_text}'. Настраиваю рабочий вайб!"
 
 
-async def _call_text_ai(history: List[Dict[str, str]]) -> str:
-    if not AI_SERVICE_URL:
-        raise RuntimeError("AI service URL is not configured")
-
-    payload = {
+def _text_ai_payload(history: List[Dict[str, str]], allow_cached: bool = False) -> Dict[str, Any]:
+    return {
         "messages": history,
         "max_new_tokens": 600,
         "temperature": 0.7,
         "top_p": 0.9,
+        "allow_cached": allow_cached,
     }
 
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        response = await client.post(
-            f"{AI_SERVICE_URL.rstrip('/')}/text/chat",
-            json=payload,
-        )
+
+async def _call_text_ai(history: List[Dict[str, str]], allow_cached: bool = False) -> str:
+    if not AI_SERVICE_URL:
+        raise RuntimeError("AI service URL is not configured")
+
+    response = await _AI_CLIENT.post("/text/chat", json=_text_ai_payload(history, allow_cached))
 
     if response.status_code >= 400:
         try:
@@ -263,64 +546,50 @@ async def _call_text_ai(history: List[Dict[str, str]]) -> str:
     raise RuntimeError("Unexpected response from text AI service")
 
 
-def _extract_structured(reply: str) -> tuple[str, Optional[Dict[str, Any]]]:
-    sanitized = (
-        reply.replace("<JSON>", JSON_MARKER)
-        .replace("JSON:", JSON_MARKER)
-        .replace("<<JSON", JSON_MARKER)
-        .replace("JSON>>", JSON_MARKER)
-        .replace("<<<", JSON_MARKER)
-        .replace(">>>", "")
-    )
+async def _stream_text_ai(history: List[Dict[str, str]], allow_cached: bool = False) -> AsyncIterator[str]:
+    if not AI_SERVICE_URL:
+        raise RuntimeError("AI service URL is not configured")
 
-    if JSON_MARKER in sanitized:
-        text_part, possible_json = sanitized.split(JSON_MARKER, 1)
-        text_part = _clean_text(text_part)
-        candidate = possible_json.strip()
-        if candidate:
-            parsed, consumed = _parse_json_substring(candidate)
-            if parsed is not None:
-                tail = _clean_text(candidate[consumed:])
-                combined_text = (text_part + (" " + tail if tail else "")).strip()
-                return combined_text, parsed
-            logger.error("Failed to parse structured JSON after marker")
-        return text_part, None
-
-    first_brace = sanitized.find("{")
-    if first_brace == -1:
-        return _clean_text(sanitized), None
-
-    base_text = _clean_text(sanitized[:first_brace])
-    json_candidate = sanitized[first_brace:]
-    parsed, consumed = _parse_json_substring(json_candidate)
-    if parsed is not None:
-        tail = _clean_text(json_candidate[consumed:])
-        combined_text = (base_text + (" " + tail if tail else "")).strip()
-        return combined_text, parsed
-    logger.error("Failed to parse structured JSON fallback")
-    return base_text, None
-
-
-def _parse_json_substring(payload: str) -> tuple[Optional[Dict[str, Any]], int]:
-    end_indices = [idx for idx, char in enumerate(payload) if char == "}"]
-    for end in reversed(end_indices):
-        candidate = payload[: end + 1].strip()
-        try:
-            data = json.loads(candidate)
-            if isinstance(data, dict):
-                return data, end + 1
-        except json.JSONDecodeError:
-            continue
-    return None, 0
-
-
-def _clean_text(text: str) -> str:
-    return (
-        text.replace("<", " ")
-        .replace(">", " ")
-        .replace(JSON_MARKER, " ")
-        .strip()
-    )
+    payload = _text_ai_payload(history, allow_cached)
+    async with _AI_CLIENT.stream("/text/chat/stream", json=payload) as response:
+        if response.status_code >= 400:
+            await response.aread()
+            try:
+                detail = response.json().get("detail")
+            except Exception:  # pragma: no cover
+                detail = response.text
+            raise RuntimeError(f"Text AI service error: {detail}")
+
+        async for event, data in _iter_sse(response):
+            if event == "token":
+                text = data.get("text")
+                if isinstance(text, str):
+                    yield text
+            elif event == "error":
+                raise RuntimeError(f"Text AI service error: {data.get('detail')}")
+            elif event == "done":
+                return
+
+
+async def _iter_sse(response: httpx.Response) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    event = "message"
+    data_lines: List[str] = []
+    async for line in response.aiter_lines():
+        if not line:
+            if data_lines:
+                try:
+                    yield event, json.loads("\n".join(data_lines))
+                except json.JSONDecodeError:
+                    logger.error("Malformed SSE payload from text AI service")
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].strip())
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
 
 if __name__ == "__main__":
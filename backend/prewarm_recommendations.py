@@ -0,0 +1,93 @@
+"""Офлайн-прогрев кэша рекомендаций профтеста.
+
+Запуск: python prewarm_recommendations.py [--top 200] [--answers answers.jsonl] [--concurrency 4]
+Берёт самые частые наборы ответов из recommendations.db и (опционально)
+из выгрузки ответов (JSON-массив или JSONL), и заранее получает
+рекомендации для тех, у кого в кэше нет свежей записи.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List
+
+from prof_test import CareerAdvisor
+from recommendation_cache import RecommendationCache, create_recommendation_cache
+
+
+def _load_answers(path: Path) -> List[Dict[str, Any]]:
+    text = path.read_text(encoding="utf-8").strip()
+    if text.startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def _candidates(cache: RecommendationCache, top: int, answers_file: Path | None) -> List[Dict[str, Any]]:
+    """Самые частые комбинации: сначала по выгрузке, затем по счётчикам БД."""
+
+    by_key: Dict[str, Dict[str, Any]] = {}
+    counts: Counter[str] = Counter()
+    if answers_file is not None:
+        for answers in _load_answers(answers_file):
+            key = cache.key(answers)
+            by_key.setdefault(key, answers)
+            counts[key] += 1
+
+    ordered = [by_key[key] for key, _ in counts.most_common(top)]
+    seen = {cache.key(answers) for answers in ordered}
+    for answers in cache.most_requested(top):
+        if len(ordered) >= top:
+            break
+        key = cache.key(answers)
+        if key not in seen:
+            seen.add(key)
+            ordered.append(answers)
+    return ordered[:top]
+
+
+async def prewarm(top: int, answers_file: Path | None, concurrency: int) -> None:
+    cache = create_recommendation_cache()
+    if cache is None:
+        raise SystemExit("Кэш рекомендаций отключён (PROFESSION_CACHE=off)")
+    advisor = CareerAdvisor(cache=cache)
+    candidates = _candidates(cache, top, answers_file)
+    semaphore = asyncio.Semaphore(concurrency)
+    counters = Counter[str]()
+
+    async def warm(answers: Dict[str, Any]) -> None:
+        if await asyncio.to_thread(cache.get, cache.key(answers), False) is not None:
+            counters["fresh"] += 1
+            return
+        async with semaphore:
+            stored = await advisor.awarm(answers)
+        counters["warmed" if stored else "failed"] += 1
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(warm(answers) for answers in candidates))
+    finally:
+        await advisor.aclose()
+
+    print(
+        f"Кандидатов: {len(candidates)}, уже в кэше: {counters['fresh']}, "
+        f"прогрето: {counters['warmed']}, ошибок: {counters['failed']} "
+        f"за {time.perf_counter() - started:.1f} c"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top", type=int, default=200, help="Сколько самых частых комбинаций прогреть")
+    parser.add_argument("--answers", type=Path, default=None, help="Выгрузка ответов (JSON или JSONL)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Параллельных запросов к GigaChat")
+    args = parser.parse_args()
+    asyncio.run(prewarm(args.top, args.answers, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
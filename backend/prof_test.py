@@ -1,8 +1,9 @@
+import asyncio
 from gigachat import GigaChat
 import ssl
 
 class CareerAdvisor:
-    def __init__(self):
+    def __init__(self, cache=None):
         ssl_context = ssl.create_default_context()
         ssl_context.check_hostname = False
         ssl_context.verify_mode = ssl.CERT_NONE
@@ -12,13 +13,108 @@ class CareerAdvisor:
             ssl_context=ssl_context,
             verify_ssl_certs=False
         )
+        # Кэш готовых рекомендаций (RecommendationCache) или None
+        self.cache = cache
+        # Одинаковые наборы ответов, которые сейчас ждут GigaChat -> общая задача
+        self._inflight = {}
+        self._upstream_calls = 0
+        self._coalesced = 0
     
     def get_recommendation(self, user_answers):
-        prompt = f"""
+        cache_key = self.cache.key(user_answers) if self.cache is not None else None
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        prompt = self._build_prompt(self._format_answers(user_answers))
+        self._upstream_calls += 1
+        try:
+            response = self.giga.chat(prompt)
+            recommendation = response.choices[0].message.content
+        except Exception as e:
+            return f"Ошибка при получении рекомендации: {str(e)}"
+        if cache_key is not None:
+            self.cache.put(cache_key, user_answers, recommendation)
+        return recommendation
+
+    def answers_key(self, user_answers):
+        """Ключ, по которому одинаковые наборы ответов считаются одним запросом."""
+        if self.cache is not None:
+            return self.cache.key(user_answers)
+        return self._format_answers(user_answers)
+
+    async def aget_recommendation(self, user_answers, raise_errors=False):
+        """Асинхронный вариант get_recommendation.
+
+        Одинаковые (после _format_answers) наборы ответов, пришедшие пока
+        предыдущий запрос ещё выполняется, получают его результат, а не
+        отдельный вызов GigaChat. С ``raise_errors=True`` ошибка GigaChat
+        пробрасывается, а не возвращается текстом.
+        """
+        cache_key = self.cache.key(user_answers) if self.cache is not None else None
+        if cache_key is not None:
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+            if cached is not None:
+                return cached
+
+        key = self._format_answers(user_answers)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._arecommend(key, user_answers, cache_key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self._coalesced += 1
+        try:
+            # shield: отмена одного клиента не должна отменять запрос для остальных
+            return await asyncio.shield(task)
+        except Exception as e:
+            if raise_errors:
+                raise
+            return f"Ошибка при получении рекомендации: {str(e)}"
+
+    async def _arecommend(self, formatted_answers, user_answers, cache_key):
+        prompt = self._build_prompt(formatted_answers)
+        self._upstream_calls += 1
+        response = await self.giga.achat(prompt)
+        recommendation = response.choices[0].message.content
+        # Кэшируем только успешные ответы: ошибка выше уходит вызывающему
+        if cache_key is not None:
+            await asyncio.to_thread(self.cache.put, cache_key, user_answers, recommendation)
+        return recommendation
+
+    async def awarm(self, user_answers):
+        """Запрашивает рекомендацию мимо кэша и кладёт её в кэш (для прогрева).
+
+        Возвращает True, если рекомендация сохранена.
+        """
+        cache_key = self.cache.key(user_answers)
+        try:
+            await self._arecommend(self._format_answers(user_answers), user_answers, cache_key)
+        except Exception:
+            return False
+        return True
+
+    async def aclose(self):
+        await self.giga.aclose()
+        if self.cache is not None:
+            self.cache.close()
+
+    def stats(self):
+        return {
+            "upstream_calls": self._upstream_calls,
+            "coalesced": self._coalesced,
+            "in_flight": len(self._inflight),
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+    def _build_prompt(self, formatted_answers):
+        return f"""
         Проанализируй ответы пользователя на профориентационный тест и порекомендуй ОДНУ наиболее подходящую профессию.
         
         ДАННЫЕ ПОЛЬЗОВАТЕЛЯ:
-        {self._format_answers(user_answers)}
+        {formatted_answers}
         
         ТРЕБОВАНИЯ К ОТВЕТУ:
         - Рекомендуй ТОЛЬКО ОДНУ профессию (самую подходящую)
@@ -30,12 +126,6 @@ class CareerAdvisor:
         
         Учти все аспекты: интересы, условия работы, сильные стороны, ограничения, сроки обучения и приоритеты.
         """
-        
-        try:
-            response = self.giga.chat(prompt)
-            return response.choices[0].message.content
-        except Exception as e:
-            return f"Ошибка при получении рекомендации: {str(e)}"
     
     def _format_answers(self, answers):
         formatted = []
@@ -0,0 +1,234 @@
+"""Кэш рекомендаций профтеста по нормализованным ответам (память + SQLite)."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from storage import BASE_DIR, SQLitePool
+
+RECOMMENDATIONS_DB_PATH = BASE_DIR / "recommendations.db"
+DEFAULT_TTL = 30 * 24 * 60 * 60
+LIST_QUESTIONS = ("q2", "q3", "q4", "q6")
+FREE_TEXT_QUESTION = "q7"
+# Сколько обращений копить в памяти, прежде чем сбросить счётчики в БД
+_TALLY_FLUSH = 100
+
+
+def _normalize(text: str) -> str:
+    return " ".join(str(text).split())
+
+
+def canonical_answers(answers: Dict[str, Any], q7_mode: str = "hash") -> Dict[str, Any]:
+    """Приводит ответы к виду, не зависящему от порядка и пробелов.
+
+    Списки (q2, q3, q4, q6) сортируются без повторов. Свободный ответ q7
+    заменяется хэшем (``q7_mode="hash"``) или отбрасывается (``"ignore"``).
+    """
+
+    canonical: Dict[str, Any] = {}
+    for question, value in answers.items():
+        if value in (None, "", [], {}):
+            continue
+        if question == FREE_TEXT_QUESTION:
+            text = _normalize(value).casefold()
+            if q7_mode == "hash" and text:
+                canonical[question] = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+            continue
+        if question in LIST_QUESTIONS:
+            canonical[question] = sorted({_normalize(item) for item in value})
+        else:
+            canonical[question] = _normalize(value)
+    return canonical
+
+
+class RecommendationCache:
+    """Рекомендации по каноническому набору ответов.
+
+    Горячие записи лежат в LRU в памяти, все — в SQLite-файле, который
+    переживает перезапуск и общий для воркеров. Записи старше ``ttl``
+    секунд не отдаются, но остаются в таблице вместе со счётчиком
+    обращений: по нему офлайн-прогрев (prewarm_recommendations.py)
+    выбирает самые частые комбинации.
+    """
+
+    def __init__(
+        self,
+        db_path: Path = RECOMMENDATIONS_DB_PATH,
+        ttl: float = DEFAULT_TTL,
+        max_entries: int = 1024,
+        q7_mode: str = "hash",
+        pool_size: int = 2,
+    ) -> None:
+        if q7_mode not in {"hash", "ignore"}:
+            raise ValueError(f"Unknown q7 mode: {q7_mode}")
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.q7_mode = q7_mode
+        self._memory: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._tally: "Counter[str]" = Counter()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._stores = 0
+
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._pool = SQLitePool(db_path, size=pool_size)
+        with self._pool.connection() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS recommendations (
+                    key TEXT PRIMARY KEY,
+                    answers TEXT NOT NULL,
+                    recommendation TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    requests INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS idx_recommendations_requests
+                ON recommendations (requests DESC);
+                """
+            )
+
+    def key(self, answers: Dict[str, Any]) -> str:
+        canonical = canonical_answers(answers, self.q7_mode)
+        encoded = json.dumps(canonical, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, count: bool = True) -> Optional[str]:
+        """Свежая рекомендация или None; ``count=False`` не учитывает обращение."""
+
+        now = time.time()
+        with self._lock:
+            if count:
+                self._tally[key] += 1
+                if sum(self._tally.values()) >= _TALLY_FLUSH:
+                    self._flush_tally()
+
+            entry = self._memory.get(key)
+            if entry is not None and entry[0] >= now:
+                self._memory.move_to_end(key)
+                self._hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._memory[key]
+
+        with self._pool.connection() as conn:
+            row = conn.execute(
+                "SELECT recommendation, expires_at FROM recommendations WHERE key = ? AND expires_at >= ?",
+                (key, now),
+            ).fetchone()
+
+        with self._lock:
+            if row is None:
+                self._misses += 1
+                return None
+            self._remember(key, row[0], row[1])
+            self._hits += 1
+            self._disk_hits += 1
+            return row[0]
+
+    def put(self, key: str, answers: Dict[str, Any], recommendation: str) -> None:
+        now = time.time()
+        expires_at = now + self.ttl
+        if self.q7_mode == "ignore":
+            # Без q7 рекомендация общая для всех с такими же q1–q6
+            answers = {question: value for question, value in answers.items() if question != FREE_TEXT_QUESTION}
+        with self._lock:
+            self._remember(key, recommendation, expires_at)
+            self._stores += 1
+            requests = self._tally.pop(key, 0)
+            self._flush_tally()
+        with self._pool.connection() as conn:
+            with conn:
+                conn.execute(
+                    """
+                    INSERT INTO recommendations (key, answers, recommendation, created_at, expires_at, requests)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (key) DO UPDATE SET
+                        answers = excluded.answers,
+                        recommendation = excluded.recommendation,
+                        created_at = excluded.created_at,
+                        expires_at = excluded.expires_at,
+                        requests = requests + excluded.requests
+                    """,
+                    (key, json.dumps(answers, ensure_ascii=False), recommendation, now, expires_at, requests),
+                )
+
+    def most_requested(self, limit: int) -> List[Dict[str, Any]]:
+        """Ответы самых частых комбинаций — для офлайн-прогрева."""
+
+        with self._lock:
+            self._flush_tally()
+        with self._pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT answers FROM recommendations ORDER BY requests DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [json.loads(answers) for (answers,) in rows]
+
+    def _remember(self, key: str, recommendation: str, expires_at: float) -> None:
+        self._memory[key] = (expires_at, recommendation)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _flush_tally(self) -> None:
+        # Вызывается под self._lock. Обращения к ключам, которых ещё нет в таблице,
+        # здесь теряются; put забирает свой ключ из счётчика до сброса
+        if not self._tally:
+            return
+        with self._pool.connection() as conn:
+            with conn:
+                conn.executemany(
+                    "UPDATE recommendations SET requests = requests + ? WHERE key = ?",
+                    [(count, key) for key, count in self._tally.items()],
+                )
+        self._tally.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._pool.connection() as conn:
+            entries, fresh = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(expires_at >= ?), 0) FROM recommendations",
+                (time.time(),),
+            ).fetchone()
+        return {
+            "path": str(self.db_path),
+            "entries": entries,
+            "fresh_entries": fresh,
+            "memory_entries": len(self._memory),
+            "ttl": self.ttl,
+            "q7_mode": self.q7_mode,
+            "hits": self._hits,
+            "disk_hits": self._disk_hits,
+            "misses": self._misses,
+            "stores": self._stores,
+            "pool": self._pool.stats(),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_tally()
+        self._pool.close()
+
+
+def create_recommendation_cache() -> Optional[RecommendationCache]:
+    """Кэш по переменным окружения; PROFESSION_CACHE=off отключает его."""
+
+    if os.getenv("PROFESSION_CACHE", "on").strip().lower() in {"0", "off", "false", "no"}:
+        return None
+    db_path = os.getenv("PROFESSION_CACHE_DB_PATH")
+    return RecommendationCache(
+        Path(db_path) if db_path else RECOMMENDATIONS_DB_PATH,
+        ttl=float(os.getenv("PROFESSION_CACHE_TTL", DEFAULT_TTL)),
+        max_entries=int(os.getenv("PROFESSION_CACHE_SIZE", 1024)),
+        q7_mode=os.getenv("PROFESSION_CACHE_Q7", "hash").strip().lower(),
+    )
@@ -1,62 +1,203 @@
 from __future__ import annotations
 
 import json
+import os
+import queue
 import re
 import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 BASE_DIR = Path(__file__).resolve().parent
 DB_PATH = BASE_DIR / "conversation_cards.db"
 CARDS_DIR = BASE_DIR / "cards_export"
 
 
-def _connect() -> sqlite3.Connection:
-    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    CARDS_DIR.mkdir(parents=True, exist_ok=True)
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
+class SQLitePool:
+    """Небольшой пул долгоживущих соединений к одному файлу SQLite.
+
+    Соединения открываются лениво (не больше ``size``), настраиваются один
+    раз (WAL, synchronous=NORMAL, mmap) и возвращаются в пул после
+    использования, поэтому кэш подготовленных выражений sqlite3 тоже
+    переживает отдельные запросы.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        size: int = 4,
+        timeout: float = 5.0,
+        mmap_size: int = 64 * 1024 * 1024,
+        cached_statements: int = 64,
+    ) -> None:
+        self.path = path
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._closed = False
+        self._checkouts = 0
+        self._waits = 0
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        if self._closed:
+            raise RuntimeError("SQLite pool is closed")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return self._open()
+                except Exception:
+                    self._created -= 1
+                    raise
+        self._waits += 1
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError("No free SQLite connection in pool") from None
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self._acquire()
+        self._checkouts += 1
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            if self._closed:
+                conn.close()
+            else:
+                self._idle.put(conn)
+
+    def close(self) -> None:
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": str(self.path),
+            "size": self.size,
+            "open": self._created,
+            "idle": self._idle.qsize(),
+            "checkouts": self._checkouts,
+            "waits": self._waits,
+        }
+
+
+_POOL: Optional[SQLitePool] = None
+_POOL_LOCK = threading.Lock()
+
+_INSERT_CARDS = "INSERT INTO conversation_cards (conversation_id, payload) VALUES (?, ?)"
+_SELECT_LATEST_CARDS = """
+    SELECT payload FROM conversation_cards
+    WHERE conversation_id = ?
+    ORDER BY created_at DESC, id DESC
+    LIMIT 1
+"""
+
+
+def _pool() -> SQLitePool:
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+                CARDS_DIR.mkdir(parents=True, exist_ok=True)
+                _POOL = SQLitePool(DB_PATH, size=int(os.getenv("SQLITE_POOL_SIZE", 4)))
+    return _POOL
 
 
 def init_db() -> None:
-    conn = _connect()
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS conversation_cards (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            conversation_id TEXT NOT NULL,
-            payload TEXT NOT NULL,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    with _pool().connection() as conn, conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS conversation_cards (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                conversation_id TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+            """
         )
-        """
-    )
-    conn.execute(
-        """
-        CREATE INDEX IF NOT EXISTS idx_cards_conversation
-        ON conversation_cards (conversation_id, created_at)
-        """
-    )
-    conn.commit()
-    conn.close()
+        conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_cards_conversation
+            ON conversation_cards (conversation_id, created_at)
+            """
+        )
+
+
+def close_db() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.close()
+            _POOL = None
+
 
+def db_stats() -> Dict[str, Any]:
+    return _pool().stats()
 
-def _file_name(conversation_id: str) -> str:
+
+def cards_file_name(conversation_id: str) -> str:
     safe = re.sub(r"[^a-zA-Z0-9_-]", "_", conversation_id)
     return f"{safe}.json"
 
 
 def save_cards(conversation_id: str, payload: Dict[str, Any]) -> Path:
-    serialized = json.dumps(payload, ensure_ascii=False)
+    save_cards_batch([(conversation_id, payload)])
+    return get_cards_file_path(conversation_id)
+
+
+def save_cards_batch(items: List[Tuple[str, Dict[str, Any]]]) -> None:
+    """Сохраняет несколько карточек одной транзакцией и обновляет файлы экспорта.
+
+    Для диалога, встретившегося в пачке несколько раз, файл пишется один раз
+    с последней версией карточек.
+    """
+
+    rows = [
+        (conversation_id, json.dumps(payload, ensure_ascii=False))
+        for conversation_id, payload in items
+    ]
+    with _pool().connection() as conn, conn:
+        conn.executemany(_INSERT_CARDS, rows)
+
+    latest = {conversation_id: payload for conversation_id, payload in items}
+    for conversation_id, payload in latest.items():
+        write_cards_file(conversation_id, payload)
 
-    conn = _connect()
-    conn.execute(
-        "INSERT INTO conversation_cards (conversation_id, payload) VALUES (?, ?)",
-        (conversation_id, serialized),
-    )
-    conn.commit()
-    conn.close()
 
-    CARDS_DIR.mkdir(parents=True, exist_ok=True)
-    file_path = CARDS_DIR / _file_name(conversation_id)
+def write_cards_file(conversation_id: str, payload: Dict[str, Any]) -> Path:
+    file_path = get_cards_file_path(conversation_id)
     file_path.write_text(
         json.dumps(payload, ensure_ascii=False, indent=2),
         encoding="utf-8",
@@ -65,24 +206,14 @@ def save_cards(conversation_id: str, payload: Dict[str, Any]) -> Path:
 
 
 def get_cards_file_path(conversation_id: str) -> Path:
-    CARDS_DIR.mkdir(parents=True, exist_ok=True)
-    return CARDS_DIR / _file_name(conversation_id)
+    return CARDS_DIR / cards_file_name(conversation_id)
 
 
 def fetch_latest_cards(conversation_id: str) -> Optional[Dict[str, Any]]:
-    conn = _connect()
-    row = conn.execute(
-        """
-        SELECT payload FROM conversation_cards
-        WHERE conversation_id = ?
-        ORDER BY created_at DESC
-        LIMIT 1
-        """,
-        (conversation_id,),
-    ).fetchone()
-    conn.close()
+    with _pool().connection() as conn:
+        row = conn.execute(_SELECT_LATEST_CARDS, (conversation_id,)).fetchone()
     if not row:
-        file_path = CARDS_DIR / _file_name(conversation_id)
+        file_path = get_cards_file_path(conversation_id)
         if file_path.exists():
             try:
                 return json.loads(file_path.read_text(encoding="utf-8"))
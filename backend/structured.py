@@ -0,0 +1,171 @@
+"""Извлечение JSON-карточек из ответа текстовой модели."""
+
+from __future__ import annotations
+
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+JSON_MARKER = "<<JSON>>"
+# Варианты маркера, которые модель выдаёт вместо JSON_MARKER
+MARKER_VARIANTS = (JSON_MARKER, "<JSON>", "JSON:", "<<JSON", "JSON>>", "<<<")
+
+# Длинные варианты раньше коротких, чтобы "<<JSON>>" не распался на "<<JSON" + ">>"
+_MARKER_RE = re.compile(
+    "|".join(re.escape(marker) for marker in sorted(MARKER_VARIANTS, key=len, reverse=True))
+)
+_MARKER_HOLDBACK = max(len(marker) for marker in MARKER_VARIANTS)
+# Внутри объекта интересны только фигурные скобки и строки (строку пропускаем целиком)
+_STRUCTURE_RE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*(?P<close>")?|[{}]')
+# Объект может начинаться только с ключа или быть пустым
+_OBJECT_START_RE = re.compile(r'\{\s*["}]')
+_DECODER = json.JSONDecoder()
+_ANGLE_BRACKETS = str.maketrans({"<": " ", ">": " "})
+
+
+def clean_text(text: str) -> str:
+    return _MARKER_RE.sub(" ", text).translate(_ANGLE_BRACKETS).strip()
+
+
+def _skip_object(text: str, pos: int) -> Optional[int]:
+    """Возвращает позицию сразу за объектом, начатым в ``pos``, или ``None``."""
+
+    depth = 0
+    for match in _STRUCTURE_RE.finditer(text, pos):
+        token = match.group()
+        if token == "{":
+            depth += 1
+        elif token == "}":
+            depth -= 1
+            if depth == 0:
+                return match.end()
+        elif match.group("close") is None:
+            return None  # незакрытая строка — дальше закрыться нечему
+    return None
+
+
+def find_json_object(text: str, start: int = 0) -> Optional[Tuple[Dict[str, Any], int, int]]:
+    """Находит первый полный JSON-объект верхнего уровня, начиная с ``start``.
+
+    Обычно объект корректен и целиком разбирается одним ``raw_decode``.
+    Иначе границы кандидатов находятся подсчётом скобок с учётом строк,
+    и ``json.loads`` вызывается только на непересекающихся срезах, так что
+    разбор остаётся линейным. Возвращает ``(объект, начало, конец)`` или ``None``.
+    """
+
+    pos = text.find("{", start)
+    if pos == -1:
+        return None
+    try:
+        data, end = _DECODER.raw_decode(text, pos)
+        return data, pos, end
+    except (json.JSONDecodeError, RecursionError):
+        # Ошибку raw_decode не повторяем: она считает строку/колонку по всему тексту
+        pass
+
+    while pos != -1:
+        end = _skip_object(text, pos)
+        if end is None:
+            return None
+        if _OBJECT_START_RE.match(text, pos):
+            try:
+                data = json.loads(text[pos:end])
+            except (json.JSONDecodeError, RecursionError):
+                data = None
+            if isinstance(data, dict):
+                return data, pos, end
+        pos = text.find("{", end)
+    return None
+
+
+def extract_structured(
+    reply: str, *, log_failures: bool = True
+) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """Делит ответ модели на текст для пользователя и JSON после маркера.
+
+    Если маркера нет, JSON ищется с первой ``{``. Текст после объекта
+    дописывается к тексту ответа.
+    """
+
+    marker = _MARKER_RE.search(reply)
+    if marker is not None:
+        text_part = clean_text(reply[: marker.start()])
+        payload_start = marker.end()
+        if not reply[payload_start:].strip():
+            return text_part, None
+    else:
+        payload_start = reply.find("{")
+        if payload_start == -1:
+            return clean_text(reply), None
+        text_part = clean_text(reply[:payload_start])
+
+    found = find_json_object(reply, payload_start)
+    if found is not None:
+        parsed, _, end = found
+        tail = clean_text(reply[end:])
+        return (text_part + (" " + tail if tail else "")).strip(), parsed
+
+    if log_failures:
+        if marker is not None:
+            logger.error("Failed to parse structured JSON after marker")
+        else:
+            logger.error("Failed to parse structured JSON fallback")
+    return text_part, None
+
+
+class StructuredStreamParser:
+    """Инкрементальный вариант extract_structured для потокового ответа.
+
+    Текст до маркера (или до первой ``{``) отдаётся событиями ``token``;
+    последние символы придерживаются, пока не станет ясно, что это не начало
+    маркера. Как только JSON-блок закрылся, отдаётся событие ``cards``.
+    """
+
+    def __init__(self) -> None:
+        self.text = ""
+        self.structured: Optional[Dict[str, Any]] = None
+        self._emitted = 0
+        self._payload_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        self.text += chunk
+        events: List[Tuple[str, Any]] = []
+
+        if self._payload_start is None:
+            self._payload_start = self._find_payload_start()
+            if self._payload_start is not None:
+                limit = self._payload_start
+            else:
+                limit = len(self.text) - _MARKER_HOLDBACK
+            self._emit_text(limit, events)
+
+        if self._payload_start is not None and self.structured is None and "}" in chunk:
+            # Блок может быть ещё не закрыт — неудачный разбор здесь ожидаем
+            _, structured = extract_structured(self.text, log_failures=False)
+            if structured is not None:
+                self.structured = structured
+                events.append(("cards", structured))
+        return events
+
+    def close(self) -> List[Tuple[str, Any]]:
+        events: List[Tuple[str, Any]] = []
+        if self._payload_start is None:
+            self._emit_text(len(self.text), events)
+        return events
+
+    def _find_payload_start(self) -> Optional[int]:
+        # Всё до self._emitted уже проверено: маркер не длиннее _MARKER_HOLDBACK
+        marker = _MARKER_RE.search(self.text, self._emitted)
+        brace = self.text.find("{", self._emitted)
+        positions = [pos for pos in (marker.start() if marker else -1, brace) if pos != -1]
+        return min(positions) if positions else None
+
+    def _emit_text(self, limit: int, events: List[Tuple[str, Any]]) -> None:
+        if limit <= self._emitted:
+            return
+        delta = self.text[self._emitted:limit].translate(_ANGLE_BRACKETS)
+        self._emitted = limit
+        events.append(("token", {"text": delta}))
@@ -0,0 +1,370 @@
+"""Индекс вакансий HeadHunter в SQLite (с FTS5) и запросы к нему.
+
+Загрузка: python vacancies_db.py ingest --base-folder ../ai/parsed_jobs
+Берёт файлы профессий, которые пишет краулер (vacancies.jsonl[.gz|.zst] или
+data.json), и собирает новую БД во временном файле, который затем атомарно
+подменяет старую. Бэкенд открывает БД только на чтение и сам замечает
+подмену файла.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from storage import BASE_DIR
+
+VACANCIES_DB_PATH = Path(os.getenv("VACANCIES_DB_PATH", BASE_DIR / "vacancies.db"))
+PROFESSION_FILES = ("vacancies.jsonl", "vacancies.jsonl.gz", "vacancies.jsonl.zst", "data.json")
+_COLUMNS = (
+    "id, name, employer_name, salary, salary_from, salary_to, salary_currency, area, "
+    "experience, schedule, employment, published_at, url, requirement, responsibility"
+)
+
+SCHEMA = """
+CREATE TABLE vacancies (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    name TEXT,
+    employer_name TEXT,
+    salary TEXT,
+    salary_from INTEGER,
+    salary_to INTEGER,
+    salary_currency TEXT,
+    area TEXT,
+    experience TEXT,
+    schedule TEXT,
+    employment TEXT,
+    published_at TEXT,
+    url TEXT,
+    requirement TEXT,
+    responsibility TEXT
+);
+CREATE TABLE vacancy_professions (
+    profession TEXT NOT NULL,
+    vacancy_id TEXT NOT NULL,
+    PRIMARY KEY (profession, vacancy_id)
+) WITHOUT ROWID;
+CREATE VIRTUAL TABLE vacancies_fts USING fts5(
+    name, requirement, responsibility,
+    content='vacancies', content_rowid='rowid', tokenize='unicode61'
+);
+"""
+
+# Индексы создаются после загрузки — так вставка идёт заметно быстрее
+INDEXES = """
+CREATE INDEX idx_vacancies_area ON vacancies (area, published_at);
+CREATE INDEX idx_vacancies_experience ON vacancies (experience, published_at);
+CREATE INDEX idx_vacancies_schedule ON vacancies (schedule, published_at);
+CREATE INDEX idx_vacancies_published ON vacancies (published_at);
+CREATE INDEX idx_vacancies_salary ON vacancies (salary_currency, salary_from);
+CREATE INDEX idx_vacancy_professions_vacancy ON vacancy_professions (vacancy_id);
+"""
+
+
+def salary_bounds(salary_raw: Optional[Dict[str, Any]]) -> Tuple[Optional[int], Optional[int], Optional[str]]:
+    """Числовая вилка (from, to, currency) из salary_raw, как его отдаёт HeadHunter."""
+
+    if not isinstance(salary_raw, dict):
+        return None, None, None
+
+    def as_int(value: Any) -> Optional[int]:
+        try:
+            return int(value) if value is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    return as_int(salary_raw.get("from")), as_int(salary_raw.get("to")), salary_raw.get("currency") or None
+
+
+def _open_text(path: Path):
+    if path.name.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.name.endswith(".zst"):
+        import zstandard  # опциональная зависимость, нужна только для .zst
+
+        return zstandard.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def _iter_file(path: Path) -> Iterator[Dict[str, Any]]:
+    if path.name.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as file:
+            yield from json.load(file).get("vacancies", [])
+        return
+    with _open_text(path) as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_profession_files(base_folder: Path) -> Iterator[Tuple[str, Path]]:
+    """Пары (профессия, файл) из папки краулера; профессия берётся из имени папки."""
+
+    for folder in sorted(path for path in base_folder.iterdir() if path.is_dir()):
+        for name in PROFESSION_FILES:
+            candidate = folder / name
+            if candidate.exists():
+                yield folder.name, candidate
+                break
+
+
+def _row(vacancy: Dict[str, Any]) -> Tuple[Any, ...]:
+    salary_from, salary_to, currency = salary_bounds(vacancy.get("salary_raw"))
+    snippet = vacancy.get("snippet") or {}
+    employer = vacancy.get("employer") or {}
+    return (
+        str(vacancy["id"]),
+        vacancy.get("name"),
+        employer.get("name"),
+        vacancy.get("salary"),
+        salary_from,
+        salary_to,
+        currency,
+        vacancy.get("area"),
+        vacancy.get("experience"),
+        vacancy.get("schedule"),
+        vacancy.get("employment"),
+        vacancy.get("published_at"),
+        vacancy.get("url"),
+        snippet.get("requirement"),
+        snippet.get("responsibility"),
+    )
+
+
+def ingest(base_folder: Path, db_path: Path = VACANCIES_DB_PATH, batch_size: int = 5000) -> Dict[str, Any]:
+    """Собирает БД вакансий с нуля и атомарно подменяет ею db_path."""
+
+    started = time.perf_counter()
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = db_path.with_name(f".tmp-{db_path.name}")
+    tmp_path.unlink(missing_ok=True)
+
+    conn = sqlite3.connect(tmp_path)
+    # Файл временный: при падении его всё равно выбросим, журнал не нужен
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.executescript(SCHEMA)
+
+    files = vacancies = links = 0
+    try:
+        for profession, path in iter_profession_files(base_folder):
+            files += 1
+            batch: List[Dict[str, Any]] = []
+            for vacancy in _iter_file(path):
+                if not vacancy.get("id"):
+                    continue
+                batch.append(vacancy)
+                if len(batch) >= batch_size:
+                    vacancies, links = _insert(conn, profession, batch, vacancies, links)
+                    batch = []
+            vacancies, links = _insert(conn, profession, batch, vacancies, links)
+
+        conn.executescript(INDEXES)
+        conn.execute("INSERT INTO vacancies_fts (vacancies_fts) VALUES ('rebuild')")
+        conn.execute("ANALYZE")
+        conn.commit()
+        (unique,) = conn.execute("SELECT COUNT(*) FROM vacancies").fetchone()
+    except BaseException:
+        conn.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+    conn.close()
+    os.replace(tmp_path, db_path)
+
+    return {
+        "files": files,
+        "rows_read": vacancies,
+        "vacancies": unique,
+        "profession_links": links,
+        "seconds": round(time.perf_counter() - started, 2),
+        "path": str(db_path),
+    }
+
+
+def _insert(
+    conn: sqlite3.Connection, profession: str, batch: List[Dict[str, Any]], vacancies: int, links: int
+) -> Tuple[int, int]:
+    if not batch:
+        return vacancies, links
+    with conn:
+        conn.executemany(
+            f"INSERT OR IGNORE INTO vacancies ({_COLUMNS}) VALUES ({', '.join('?' * 15)})",
+            [_row(vacancy) for vacancy in batch],
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO vacancy_professions (profession, vacancy_id) VALUES (?, ?)",
+            [(profession, str(vacancy["id"])) for vacancy in batch],
+        )
+    return vacancies + len(batch), links + len(batch)
+
+
+def fts_query(text: str) -> Optional[str]:
+    """Поисковая строка FTS5 из пользовательского текста: все слова, с префиксным поиском."""
+
+    words = ["".join(char for char in word if char.isalnum()) for word in text.split()]
+    words = [word for word in words if word]
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+class VacancyIndex:
+    """Доступ к БД вакансий только на чтение.
+
+    У каждого потока своё соединение. Если ingest подменил файл, соединения
+    переоткрываются при следующем запросе.
+    """
+
+    def __init__(self, db_path: Path = VACANCIES_DB_PATH) -> None:
+        self.db_path = db_path
+        self._local = threading.local()
+        self._generation = 0
+        self._file_id: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+        self._queries = 0
+        self._total_ms = 0.0
+
+    @property
+    def available(self) -> bool:
+        return self.db_path.exists()
+
+    def _connection(self) -> sqlite3.Connection:
+        stat = self.db_path.stat()
+        file_id = (stat.st_ino, stat.st_mtime_ns)
+        with self._lock:
+            if file_id != self._file_id:
+                self._file_id = file_id
+                self._generation += 1
+            generation = self._generation
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.generation != generation:
+            if conn is not None:
+                conn.close()
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA query_only=1")
+            conn.execute("PRAGMA mmap_size=268435456")
+            self._local.conn = conn
+            self._local.generation = generation
+        return conn
+
+    def search(
+        self,
+        profession: Optional[str] = None,
+        text: Optional[str] = None,
+        area: Optional[str] = None,
+        experience: Optional[str] = None,
+        schedule: Optional[str] = None,
+        salary_min: Optional[int] = None,
+        salary_max: Optional[int] = None,
+        currency: Optional[str] = None,
+        published_from: Optional[str] = None,
+        page: int = 0,
+        per_page: int = 20,
+    ) -> Dict[str, Any]:
+        """Фильтрация и пагинация, свежие вакансии первыми."""
+
+        started = time.perf_counter()
+        joins: List[str] = []
+        where: List[str] = []
+        params: List[Any] = []
+
+        match = fts_query(text) if text else None
+        if match is not None:
+            joins.append("JOIN vacancies_fts ON vacancies_fts.rowid = v.rowid")
+            where.append("vacancies_fts MATCH ?")
+            params.append(match)
+        if profession:
+            where.append("v.id IN (SELECT vacancy_id FROM vacancy_professions WHERE profession = ?)")
+            params.append(profession)
+        for column, value in (("area", area), ("experience", experience), ("schedule", schedule)):
+            if value:
+                where.append(f"v.{column} = ?")
+                params.append(value)
+        if currency:
+            where.append("v.salary_currency = ?")
+            params.append(currency)
+        if salary_min is not None:
+            # Вилка вакансии пересекается с запрошенной
+            where.append("COALESCE(v.salary_to, v.salary_from) >= ?")
+            params.append(salary_min)
+        if salary_max is not None:
+            where.append("COALESCE(v.salary_from, v.salary_to) <= ?")
+            params.append(salary_max)
+        if published_from:
+            where.append("v.published_at >= ?")
+            params.append(published_from)
+
+        source = "FROM vacancies v " + " ".join(joins)
+        condition = f"WHERE {' AND '.join(where)}" if where else ""
+        conn = self._connection()
+        (total,) = conn.execute(f"SELECT COUNT(*) {source} {condition}", params).fetchone()
+        rows = conn.execute(
+            f"SELECT {', '.join('v.' + column.strip() for column in _COLUMNS.split(','))} {source} {condition} "
+            "ORDER BY v.published_at DESC LIMIT ? OFFSET ?",
+            [*params, per_page, page * per_page],
+        ).fetchall()
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._queries += 1
+            self._total_ms += elapsed_ms
+        return {
+            "items": [dict(row) for row in rows],
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+        }
+
+    def openings_for_card(self, profession: str, limit: int = 3) -> List[Dict[str, str]]:
+        """Реальные вакансии для growth_table.vacancies в формате, который понимает фронтенд."""
+
+        if not self.available or not profession.strip():
+            return []
+        items = self.search(text=profession, per_page=limit)["items"]
+        return [
+            {
+                "title": item["name"] or profession,
+                "salary": item["salary"] or "З/п по договорённости",
+                "link": item["url"] or "#",
+            }
+            for item in items
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        if not self.available:
+            return {"available": False, "path": str(self.db_path)}
+        with self._lock:
+            queries, total_ms = self._queries, self._total_ms
+        return {
+            "available": True,
+            "path": str(self.db_path),
+            "file_bytes": self.db_path.stat().st_size,
+            "queries": queries,
+            "avg_query_ms": round(total_ms / queries, 3) if queries else 0.0,
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Индекс вакансий HeadHunter в SQLite")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    ingest_parser = subcommands.add_parser("ingest", help="Загрузить вакансии из папки краулера")
+    ingest_parser.add_argument("--base-folder", type=Path, default=Path("parsed_jobs"))
+    ingest_parser.add_argument("--db", type=Path, default=VACANCIES_DB_PATH)
+    args = parser.parse_args()
+
+    if args.command == "ingest":
+        print(ingest(args.base_folder, args.db))
+
+
+if __name__ == "__main__":
+    main()